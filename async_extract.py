@@ -0,0 +1,155 @@
+"""
+asyncio front end for the outline extractors.
+
+    result = await extract_outline_async('input/sample.pdf')
+    result = await extract_outline_async(NamedPDF(pdf_bytes, 'sample.pdf'), timeout=30)
+
+    async with AsyncExtractor('gemini', workers=4, timeout=60) as ex:
+        results = await asyncio.gather(*(ex.extract(src) for src in sources), return_exceptions=True)
+
+A source is a path, bytes, bytearray, memoryview or mmap (see pdf_source).
+Each document is put in a shared-memory block.  A path is read straight into
+the block by an I/O thread; an in-memory source is copied into it once.  A
+worker of a warm process pool then opens the block with
+fitz.open(stream=...) without copying it again.  Reading waiting documents
+therefore overlaps with extracting the running ones, and at most
+max_inflight documents (default 2 x workers) are held at a time.
+
+Each document gets `timeout` seconds.  Where SIGALRM exists, the worker
+interrupts itself and the call raises TimeoutError.  A worker that is stuck
+in native code and doesn't return within `grace` more seconds is killed.
+The pool is then rebuilt, so other documents running at that moment fail
+with BrokenProcessPool.
+
+The pool is a pdf_source.process_pool (mind its note on `__main__` guards).
+"""
+import asyncio, gc, os, signal, weakref
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+from pdf_source import NamedPDF, as_stream, is_path, process_pool
+from batch_runner import load_extractor
+
+TIMEOUT = 300.0
+GRACE = 5.0
+
+# ---------- worker side ----------
+
+@contextmanager
+def _deadline(seconds):
+    if not seconds or not hasattr(signal, 'setitimer'):
+        yield
+        return
+    def expire(signum, frame):
+        raise TimeoutError(f'extraction exceeded {seconds}s')
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+def _extract_shared(extractor, shm_name, size, name, options, timeout):
+    shm = shared_memory.SharedMemory(name=shm_name)  # pool workers share the parent's resource tracker
+    try:
+        mod = load_extractor(extractor)
+        with _deadline(timeout):
+            return mod.extract_outline(NamedPDF(shm.buf[:size], name), **options)
+    finally:
+        gc.collect()  # drop the document (and its view of the block) before closing it
+        try:
+            shm.close()
+        except BufferError:
+            pass  # still referenced from an exception traceback; unmapped when that goes away
+
+# ---------- event-loop side ----------
+
+def _to_shared(source):
+    """Copy or read a source into a new shared-memory block; returns (block, size, name)."""
+    if is_path(source):
+        with open(source, 'rb') as fp:
+            size = os.fstat(fp.fileno()).st_size
+            shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+            with shm.buf[:size] as view:
+                pos = 0
+                while pos < size:
+                    n = fp.readinto(view[pos:])
+                    if not n:
+                        break
+                    pos += n
+            return shm, pos, os.fspath(source)
+    with memoryview(as_stream(source)) as data:  # released on exit, so the caller can close an mmap
+        shm = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+        shm.buf[:data.nbytes] = data
+        return shm, data.nbytes, source.name if isinstance(source, NamedPDF) else ''
+
+class AsyncExtractor:
+    def __init__(self, extractor='gemini', workers=None, timeout=TIMEOUT, max_inflight=None, grace=GRACE, **options):
+        self.extractor = extractor
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.max_inflight = max_inflight or 2 * self.workers
+        self.grace = grace
+        self.options = options
+        self._io = ThreadPoolExecutor(self.max_inflight, thread_name_prefix='pdf-read')
+        self._pool = self._start()
+        self._slots = weakref.WeakKeyDictionary()  # event loop -> semaphore
+
+    def _start(self):
+        return process_pool(self.workers, initializer=load_extractor, initargs=(self.extractor,))
+
+    def _kill(self):
+        pool, self._pool = self._pool, self._start()
+        for proc in list(getattr(pool, '_processes', {}).values()):
+            proc.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _slot(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self._slots:
+            self._slots[loop] = asyncio.Semaphore(self.max_inflight)
+        return self._slots[loop]
+
+    async def extract(self, source, timeout=None, **options):
+        """Outline dict for one document; raises TimeoutError past the deadline."""
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        async with self._slot():
+            shm, size, name = await loop.run_in_executor(self._io, _to_shared, source)
+            try:
+                args = (self.extractor, shm.name, size, name, {**self.options, **options}, timeout)
+                try:
+                    fut = self._pool.submit(_extract_shared, *args)
+                except BrokenProcessPool:
+                    self._pool = self._start()
+                    fut = self._pool.submit(_extract_shared, *args)
+                # asyncio.wait rather than wait_for: the worker's own TimeoutError must not look like ours
+                done, _ = await asyncio.wait([asyncio.wrap_future(fut)], timeout=timeout + self.grace if timeout else None)
+                if not done:
+                    self._kill()
+                    raise TimeoutError(f'{name or "document"}: worker did not stop after {timeout}s; killed')
+                return done.pop().result()
+            finally:
+                shm.close()
+                shm.unlink()
+
+    def close(self):
+        self._pool.shutdown()
+        self._io.shutdown()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+_shared = {}
+
+async def extract_outline_async(source, extractor='gemini', timeout=TIMEOUT, **options):
+    """Extract one document on a process-wide AsyncExtractor per extractor (one worker per CPU)."""
+    if extractor not in _shared:
+        _shared[extractor] = AsyncExtractor(extractor)
+    return await _shared[extractor].extract(source, timeout=timeout, **options)
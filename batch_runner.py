@@ -0,0 +1,291 @@
+"""
+Parallel input/ → output/ runner for the outline extractors.
+
+    python batch_runner.py --extractor gemini --input input --output output --workers 8
+
+Each worker process imports the extractor (and so unpickles the model) once
+and then serves files until the batch is done.  Files are handed out
+largest-first; a PDF that crashes its worker or exceeds --timeout is recorded
+as failed and the worker is replaced, the rest of the batch keeps going.
+"""
+import timings  # first, so --timings counts the imports below
+import argparse, importlib, importlib.util, json, multiprocessing as mp, os, queue, sys, time, traceback
+import heading_classifier, result_cache
+from profiling import NULL_METRICS, Metrics
+
+EXTRACTORS = ('gemini', 'main_extractor')
+GEMINI_ONLY = ('header_footer', 'clip_bands', 'incremental', 'max_rss_mb', 'pages', 'deadline')
+POLL_SECS = 0.2
+
+# ---------- scheduling ----------
+
+def page_count(path):
+    import fitz
+    try:
+        with fitz.open(path) as doc:
+            return doc.page_count
+    except Exception:
+        return 0
+
+def list_jobs(in_dir, order='bytes'):
+    """PDFs in in_dir, largest first (by file size or page count)."""
+    paths = [os.path.join(in_dir, f) for f in sorted(os.listdir(in_dir)) if f.lower().endswith('.pdf')]
+    weight = page_count if order == 'pages' else os.path.getsize
+    return sorted(paths, key=weight, reverse=True)
+
+def output_path(pdf_path, out_dir):
+    return os.path.join(out_dir, os.path.splitext(os.path.basename(pdf_path))[0] + '.json')
+
+# ---------- worker ----------
+
+_extractors = {}
+
+def extractor_model(mod, classifier='features'):
+    return heading_classifier.model_for(classifier, getattr(mod, 'MODEL_PATH', heading_classifier.MODEL_PATH))
+
+def load_extractor(extractor, classifier='features'):
+    """
+    The extractor module, imported and its model loaded once per process, so that a worker's jobs
+    only pay for the extraction (batch_runner, warm_worker and async_extract workers start with this).
+    """
+    if extractor not in EXTRACTORS:
+        raise ValueError(f'unknown extractor {extractor!r}, expected one of {EXTRACTORS}')
+    if (extractor, classifier) not in _extractors:
+        mod = importlib.import_module(extractor)
+        model_path = extractor_model(mod, classifier)
+        if os.path.exists(heading_classifier.model_file(model_path)):
+            heading_classifier.load_model(model_path)
+        _extractors[extractor, classifier] = mod
+    return _extractors[extractor, classifier]
+
+def _worker(extractor, out_dir, cache_dir, cache_max_bytes, profile, options, task_q, result_q):
+    t_start = time.perf_counter()
+    mod = load_extractor(extractor, options.get('classifier', 'features'))
+    model_path = extractor_model(mod, options.get('classifier', 'features'))
+    startup_ms = (time.perf_counter() - t_start) * 1000
+    while True:
+        path = task_q.get()
+        if path is None:
+            break
+        t0 = time.perf_counter()
+        rec = {'file': path, 'pages': 0}
+        if startup_ms is not None:
+            rec['worker_startup_ms'], startup_ms = startup_ms, None
+        metrics = Metrics() if profile else NULL_METRICS
+        try:
+            res, key = None, None
+            if cache_dir:
+                key = result_cache.cache_key(mod.extract_outline, path, options, model_path)
+                hit = result_cache.get(key, cache_dir, meta=True)
+                if hit is not None:
+                    res, meta = hit
+                    rec['pages'] = meta.get('pages', 0)
+            rec['cached'] = res is not None
+            if res is None:
+                rec['pages'] = page_count(path)
+                opts = options
+                if options.get('page_cache') is True:  # --incremental: next to the output JSON
+                    from incremental import cache_path
+                    opts = dict(options, page_cache=cache_path(output_path(path, out_dir)))
+                res = mod.extract_outline(path, metrics=metrics, **opts)
+            with metrics.stage('write_json'), open(output_path(path, out_dir), 'w') as fp:
+                json.dump(res, fp, indent=2)
+            if not rec['cached'] and key and res.get('complete', True):  # a deadline-cut result isn't the file's result
+                try:  # after the output is written: a cache problem mustn't cost the file its result
+                    result_cache.put(key, res, cache_dir, cache_max_bytes, meta={'pages': rec['pages']})
+                except OSError as e:
+                    rec['cache_error'] = f'{type(e).__name__}: {e}'
+            if profile:
+                rec['metrics'] = metrics.as_dict()
+                with open(output_path(path, out_dir)[:-len('.json')] + '.metrics.json', 'w') as fp:
+                    json.dump(rec['metrics'], fp, indent=2)
+            rec.update(status='ok', headings=len(res.get('outline', [])))
+            if 'complete' in res:
+                rec.update(complete=res['complete'], coverage=res['coverage'])
+            if options.get('max_rss_mb'):
+                from memory_budget import peak_rss_mb
+                rec['peak_rss_mb'] = round(peak_rss_mb(), 1)  # this worker's peak so far
+        except Exception as e:
+            rec.update(status='error', error=f'{type(e).__name__}: {e}', trace=traceback.format_exc())
+        rec['wall_secs'] = time.perf_counter() - t0
+        result_q.put(rec)
+
+def _spawn(extractor, out_dir, cache_dir, cache_max_bytes, profile, options, result_q):
+    task_q = mp.Queue()
+    args = (extractor, out_dir, cache_dir, cache_max_bytes, profile, options, task_q, result_q)
+    proc = mp.Process(target=_worker, args=args, daemon=True)
+    proc.start()
+    return {'proc': proc, 'tasks': task_q, 'job': None, 'started': 0.0}
+
+# ---------- runner ----------
+
+def run_batch(in_dir='input', out_dir='output', extractor='gemini', workers=None, timeout=300.0, order='bytes',
+              cache_dir=None, cache_max_bytes=result_cache.MAX_BYTES, profile=False, options=None, index=True):
+    """
+    Extract every PDF in in_dir into out_dir in parallel and return the run summary.
+    options are passed to the extractor's extract_outline as keyword arguments.
+    index=True adds each result to out_dir's heading index as it arrives (see heading_index).
+    """
+    options = options or {}
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = list_jobs(in_dir, order)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+    result_q = mp.Queue()
+    spawn = lambda: _spawn(extractor, out_dir, cache_dir, cache_max_bytes, profile, options, result_q)
+    pool = [spawn() for _ in range(workers)]
+    records, pending, t_run = [], list(jobs), time.perf_counter()
+
+    def finish(rec):
+        rec['pages_per_sec'] = rec['pages'] / rec['wall_secs'] if rec['wall_secs'] > 0 else 0.0
+        rec['done_secs'] = time.perf_counter() - t_run
+        records.append(rec)
+        if index and rec['status'] == 'ok':
+            try:
+                index.add(output_path(rec['file'], out_dir))
+            except Exception as e:  # e.g. 'database is locked' by a concurrent heading_index update
+                rec['index_error'] = f'{type(e).__name__}: {e}'
+
+    if index:
+        from heading_index import HeadingIndex
+        index = HeadingIndex(out_dir)
+    try:
+        while pending or any(w['job'] for w in pool):
+            for w in pool:
+                if w['job'] is None and pending:
+                    w['job'], w['started'] = pending.pop(0), time.perf_counter()
+                    w['tasks'].put(w['job'])
+            try:
+                rec = result_q.get(timeout=POLL_SECS)
+                w = next((w for w in pool if w['job'] == rec['file']), None)
+                if w is not None:  # else: late result from a worker already replaced
+                    w['job'] = None
+                    finish(rec)
+            except queue.Empty:
+                pass
+            # replace workers that died or ran past the per-file timeout
+            for i, w in enumerate(pool):
+                if w['job'] is None:
+                    continue
+                elapsed = time.perf_counter() - w['started']
+                if w['proc'].is_alive() and elapsed <= timeout:
+                    continue
+                status = 'timeout' if w['proc'].is_alive() else 'crashed'
+                w['proc'].kill()
+                w['proc'].join()
+                # not page_count(): reopening the file that just hung or crashed a worker could do the same here
+                finish({'file': w['job'], 'pages': 0, 'status': status,
+                        'error': f'worker {status} (exit code {w["proc"].exitcode})', 'wall_secs': elapsed})
+                pool[i] = spawn()
+
+        for w in pool:
+            w['tasks'].put(None)
+        for w in pool:
+            w['proc'].join(timeout=5)
+    finally:
+        if index:
+            index.close()
+
+    wall = time.perf_counter() - t_run
+    pages = sum(r['pages'] for r in records if r['status'] == 'ok')
+    return {
+        'extractor': extractor,
+        'workers': workers,
+        'files': len(records),
+        'failed': sum(r['status'] != 'ok' for r in records),
+        'cache_hits': sum(bool(r.get('cached')) for r in records),
+        'partial': sum(r.get('complete') is False for r in records),
+        'pages': pages,
+        'wall_secs': wall,
+        'pages_per_sec': pages / wall if wall > 0 else 0.0,
+        'first_result_secs': min((r['done_secs'] for r in records), default=None),
+        'results': records,
+    }
+
+def parser():
+    ap = argparse.ArgumentParser(description='Run an outline extractor over a directory of PDFs in parallel.')
+    ap.add_argument('--extractor', choices=EXTRACTORS, default='gemini')
+    ap.add_argument('--input', default='input')
+    ap.add_argument('--output', default='output')
+    ap.add_argument('--workers', type=int, default=None, help='default: number of CPUs')
+    ap.add_argument('--timeout', type=float, default=300.0, help='per-file timeout in seconds')
+    ap.add_argument('--order', choices=('bytes', 'pages'), default='bytes', help='size measure for largest-first scheduling')
+    ap.add_argument('--cache-dir', default=None, help=f'reuse results for unchanged PDFs (e.g. {result_cache.CACHE_DIR})')
+    ap.add_argument('--cache-max-mb', type=float, default=result_cache.MAX_BYTES / 2**20)
+    ap.add_argument('--toc', choices=('off', 'trust', 'verify'), default='verify',
+                    help="use the embedded bookmark tree when plausible; its headings have font_size null (see native_toc.py)")
+    ap.add_argument('--header-footer', choices=('band', 'repeat'), default=None,
+                    help="gemini only: drop the whole margin band, or only lines that repeat across pages")
+    ap.add_argument('--classifier', choices=heading_classifier.CLASSIFIERS, default=None,
+                    help="ML fallback: the 8-feature forest, or the traingemini.py text model ('text')")
+    ap.add_argument('--clip-bands', action='store_true',
+                    help='gemini only: never parse the header/footer bands (band mode; see gemini.iter_outline)')
+    ap.add_argument('--incremental', action='store_true',
+                    help='gemini only: re-parse only the pages changed since the last run (<name>.pages.json, see incremental.py)')
+    ap.add_argument('--max-rss-mb', type=float, default=None,
+                    help='gemini only: memory ceiling per worker for very long PDFs (see memory_budget.py)')
+    ap.add_argument('--pages', default=None,
+                    help="gemini only: read only these pages, e.g. '1-10,~10' (first 10 + 10 spread over the rest; see partial.py)")
+    ap.add_argument('--deadline', type=float, default=None,
+                    help='gemini only: per-file seconds after which the headings so far are written, marked incomplete')
+    ap.add_argument('--no-index', action='store_true',
+                    help="don't add results to the heading index (<output>/.headings.sqlite, see heading_index.py)")
+    ap.add_argument('--profile', action='store_true', help='write per-stage metrics to <name>.metrics.json sidecars')
+    ap.add_argument('--timings', action='store_true', help='add start-up/stage timings to the summary and stderr')
+    ap.add_argument('--summary', default=None, help='run summary path (default: <output>/run_summary.json)')
+    return ap
+
+def check_args(ap, args):
+    """Stop up front (ap.error) on options that would fail every file instead."""
+    if args.extractor != 'gemini':
+        used = [f"--{name.replace('_', '-')}" for name in GEMINI_ONLY
+                if getattr(args, name) is not None and getattr(args, name) is not False]  # --deadline 0 counts
+        if used:
+            ap.error(f"{', '.join(used)}: gemini only, not supported by --extractor {args.extractor}")
+    if args.pages is not None:
+        from partial import parse_pages
+        try:
+            parse_pages(args.pages, 1)
+        except ValueError as e:
+            ap.error(f'--pages {args.pages!r}: not a page spec ({e})')
+    if args.classifier == 'text':
+        # not shipped: traingemini.py builds it, and unpickling it needs scikit-learn
+        path = heading_classifier.TEXT_MODEL_PATH
+        if not os.path.exists(path):
+            ap.error(f'--classifier text: {path} not found (train it with traingemini.py)')
+        if importlib.util.find_spec('sklearn') is None:
+            ap.error(f'--classifier text: {path} needs scikit-learn, which is not installed')
+
+def run(args):
+    """Run a batch for parsed command-line args, write and print the summary, and return it."""
+    with timings.stage('batch'):
+        summary = run_batch(args.input, args.output, args.extractor, args.workers, args.timeout, args.order,
+                            args.cache_dir, int(args.cache_max_mb * 2**20), args.profile,
+                            {'toc': args.toc, **({'header_footer': args.header_footer} if args.header_footer else {}),
+                             **({'clip_bands': True} if args.clip_bands else {}),
+                             **({'classifier': args.classifier} if args.classifier else {}),
+                             **({'max_rss_mb': args.max_rss_mb} if args.max_rss_mb else {}),
+                             **({'page_cache': True} if args.incremental else {}),
+                             **({'pages': args.pages} if args.pages else {}),
+                             **({'deadline': args.deadline} if args.deadline is not None else {})},
+                            not args.no_index)
+    if args.timings:
+        summary['timings'] = timings.report()
+        summary['timings']['worker_startup_ms'] = max((r['worker_startup_ms'] for r in summary['results'] if 'worker_startup_ms' in r), default=None)
+        timings.print_report()
+    summary_path = args.summary or os.path.join(args.output, 'run_summary.json')
+    with open(summary_path, 'w') as fp:
+        json.dump(summary, fp, indent=2)
+    print(f"[✓] {summary['files']} files ({summary['failed']} failed), "
+          f"{summary['pages']} pages in {summary['wall_secs']:.1f}s "
+          f"({summary['pages_per_sec']:.1f} pages/s) → {summary_path}")
+    return summary
+
+def main(argv=None):
+    ap = parser()
+    args = ap.parse_args(argv)
+    check_args(ap, args)
+    timings.mark_ready()
+    return 1 if run(args)['failed'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
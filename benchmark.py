@@ -0,0 +1,149 @@
+"""
+Throughput benchmark for the four extractors.
+
+    python benchmark.py --pages 10 100 --tables --repeat 3 --out bench.json
+    python benchmark.py --pdf input/*.pdf
+
+Each (extractor, document) pair runs in a fresh interpreter so peak RSS and
+import/model-load cost are measured in isolation.  Results are JSON (one
+record per pair, plus the git commit) so runs can be diffed across commits.
+"""
+import argparse, json, os, platform, resource, subprocess, sys, tempfile, time
+
+EXTRACTORS = ('main', 'main1', 'main_extractor', 'gemini')
+
+# ---------- child: time one extractor on one document ----------
+
+def _run_extractor(name, mod, pdf_path, out_path, classifier='features'):
+    if name == 'main':
+        mod.extract_headings_from_pdf(pdf_path, out_path)
+        return None
+    if name == 'main1':
+        return mod.extract_headings_from_pdf(pdf_path)
+    return mod.extract_outline(pdf_path, classifier=classifier)
+
+def measure(name, pdf_path, repeat=1, classifier='features'):
+    """Time one extractor on one PDF in the current process."""
+    import importlib
+    stages = {}
+    t = time.perf_counter()
+    mod = importlib.import_module(name)
+    stages['import'] = time.perf_counter() - t
+
+    if hasattr(mod, 'MODEL_PATH'):
+        # the model loads lazily on first use; keep it out of the per-document time
+        from heading_classifier import load_model, model_for
+        t = time.perf_counter()
+        load_model(model_for(classifier, mod.MODEL_PATH))
+        stages['model_load'] = time.perf_counter() - t
+
+    import fitz
+    t = time.perf_counter()
+    with fitz.open(pdf_path) as doc:
+        pages = doc.page_count
+    stages['open'] = time.perf_counter() - t
+
+    runs, res = [], None
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(max(1, repeat)):
+            t = time.perf_counter()
+            res = _run_extractor(name, mod, pdf_path, os.path.join(tmp, 'out.json'), classifier)
+            runs.append(time.perf_counter() - t)
+    t = time.perf_counter()
+    json.dumps(res)
+    stages['serialize'] = time.perf_counter() - t
+    stages['extract'] = min(runs)
+
+    pipeline = {}
+    if name != 'main':
+        # one extra, instrumented run for the in-pipeline stage breakdown
+        from profiling import Metrics
+        m = Metrics()
+        if name == 'main1':
+            mod.extract_headings_from_pdf(pdf_path, metrics=m)
+        else:
+            mod.extract_outline(pdf_path, metrics=m, classifier=classifier)
+        pipeline = m.as_dict()
+
+    return {
+        'extractor': name,
+        'pdf': pdf_path,
+        'classifier': classifier,
+        'pages': pages,
+        'runs_secs': runs,
+        'best_secs': min(runs),
+        'pages_per_sec': pages / min(runs) if min(runs) > 0 else 0.0,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,  # KiB on Linux
+        'stages_secs': stages,
+        'pipeline': pipeline,
+    }
+
+# ---------- parent: fan out over extractors × documents ----------
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def run_one(name, pdf_path, repeat=1, timeout=600, classifier='features'):
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', name, pdf_path, '--repeat', str(repeat),
+                           '--classifier', classifier],
+                          capture_output=True, text=True, timeout=timeout,
+                          cwd=os.path.dirname(os.path.abspath(__file__)))
+    lines = [ln for ln in proc.stdout.splitlines() if ln.startswith('{')]
+    if proc.returncode or not lines:
+        return {'extractor': name, 'pdf': pdf_path, 'error': (proc.stderr or proc.stdout).strip().splitlines()[-1:]}
+    return json.loads(lines[-1])
+
+def run_suite(pdfs, extractors=EXTRACTORS, repeat=1, classifier='features'):
+    results = []
+    for pdf in pdfs:
+        for name in extractors:
+            rec = run_one(name, os.path.abspath(pdf), repeat, classifier=classifier)
+            results.append(rec)
+            if 'error' in rec:
+                print(f'{name:15s} {os.path.basename(pdf):40s} ERROR {rec["error"]}', file=sys.stderr)
+            else:
+                print(f'{name:15s} {os.path.basename(pdf):40s} {rec["pages_per_sec"]:9.1f} pages/s '
+                      f'{rec["peak_rss_mb"]:7.1f} MB', file=sys.stderr)
+    return {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Benchmark the heading extractors on synthetic or given PDFs.')
+    ap.add_argument('--pdf', nargs='*', default=None, help='benchmark these PDFs instead of generating synthetic ones')
+    ap.add_argument('--pages', type=int, nargs='+', default=[10, 100])
+    ap.add_argument('--tables', action='store_true')
+    ap.add_argument('--columns', type=int, default=1)
+    ap.add_argument('--extractors', nargs='+', choices=EXTRACTORS, default=list(EXTRACTORS))
+    ap.add_argument('--repeat', type=int, default=1)
+    ap.add_argument('--classifier', choices=('features', 'text'), default='features',
+                    help='ML fallback for main_extractor/gemini (text needs text_model.pkl from traingemini.py)')
+    ap.add_argument('--out', default='-', help='JSON results path, or - for stdout')
+    ap.add_argument('--child', nargs=2, metavar=('EXTRACTOR', 'PDF'), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child[0], args.child[1], args.repeat, args.classifier)))
+        sys.exit(0)
+
+    if args.pdf:
+        report = run_suite(args.pdf, args.extractors, args.repeat, args.classifier)
+    else:
+        from synth_pdfs import make_suite
+        with tempfile.TemporaryDirectory() as tmp:
+            pdfs = make_suite(tmp, args.pages, tables=args.tables, columns=args.columns)
+            report = run_suite(pdfs, args.extractors, args.repeat, args.classifier)
+    report['args'] = {k: v for k, v in vars(args).items() if k != 'child'}
+    if args.out == '-':
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.out, 'w') as fp:
+            json.dump(report, fp, indent=2)
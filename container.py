@@ -0,0 +1,160 @@
+"""
+Container entry point: batch_runner over a mounted input directory, sized to the container's limits.
+
+    docker run -v $PWD/input:/app/input -v $PWD/output:/app/output intelligentpdf
+    docker run ... intelligentpdf --extractor main_extractor --toc off     # any batch_runner option
+    python container.py --limits      # what the sizing sees, as JSON
+    python container.py --warm        # image build step: import everything, load the models, parse a page
+
+os.cpu_count() is the host's core count, not the pod's share.  Unless
+--workers is given, the pool is the CPU quota of this process's cgroup
+(cpu.max on cgroup v2, cpu.cfs_quota_us / cpu.cfs_period_us on v1; the
+lowest along the cgroup's ancestors), rounded down and at least 1, capped by
+the CPU affinity mask, and by how many workers of WORKER_MB fit into the
+memory limit (memory.max / memory.limit_in_bytes) next to the parent.  For
+inputs with very long PDFs, add --max-rss-mb with a worker's share of the
+limit (see memory_budget.py).
+
+With the fork start method the parent imports the extractor and loads the
+model before the pool starts, so workers begin with both and the first
+result only waits for the extraction itself.  On exit a '[container]' line
+reports the limits, the pool size and throughput (files/s, pages/s, time to
+the first result); the full summary is batch_runner's run_summary.json.
+"""
+import timings  # first, so --timings counts the imports below
+import importlib, json, math, multiprocessing as mp, os, sys
+import batch_runner
+
+CGROUP = '/sys/fs/cgroup'
+WORKER_MB = 200     # an idle worker with the model is ~70 MB; MuPDF adds 15-20 KB per open page on long files
+PARENT_MB = 100     # the runner itself, the heading index and the page cache
+UNLIMITED = 2**60   # cgroup v1 reports "no limit" as a huge page-aligned number
+
+# ---------- cgroup limits ----------
+
+def _cgroup_dirs(controller):
+    """Directories holding controller's files for this process's cgroup and its ancestors, innermost first."""
+    v2 = os.path.exists(os.path.join(CGROUP, 'cgroup.controllers'))
+    root = CGROUP if v2 else os.path.join(CGROUP, controller)
+    rel = '/'
+    try:
+        with open('/proc/self/cgroup') as fp:
+            for line in fp:
+                _, names, path = line.rstrip('\n').split(':', 2)
+                if (not names) if v2 else controller in names.split(','):
+                    rel = path
+    except (OSError, ValueError):
+        pass
+    dirs = []
+    while True:
+        d = os.path.join(root, rel.lstrip('/'))
+        if os.path.isdir(d):  # in a cgroup namespace our path isn't under the mount, only the root is
+            dirs.append(d)
+        if rel in ('/', ''):
+            return dirs
+        rel = os.path.dirname(rel)
+
+def _read(path):
+    try:
+        with open(path) as fp:
+            return fp.read().split()
+    except OSError:
+        return None
+
+def cpu_quota():
+    """CPUs the cgroup may use (e.g. 1.5), or None if unlimited or unknown."""
+    quotas = []
+    for d in _cgroup_dirs('cpu'):
+        v2, quota, period = _read(os.path.join(d, 'cpu.max')), None, None
+        if v2:
+            quota, period = v2[0], v2[1]
+        else:
+            quota = (_read(os.path.join(d, 'cpu.cfs_quota_us')) or [None])[0]
+            period = (_read(os.path.join(d, 'cpu.cfs_period_us')) or [None])[0]
+        if quota not in (None, 'max', '-1') and period and int(period) > 0:
+            quotas.append(int(quota) / int(period))
+    return min(quotas, default=None)
+
+def memory_limit():
+    """Memory limit of the cgroup in bytes, or None if unlimited or unknown."""
+    limits = []
+    for d in _cgroup_dirs('memory'):
+        value = _read(os.path.join(d, 'memory.max')) or _read(os.path.join(d, 'memory.limit_in_bytes'))
+        if value and value[0].isdigit() and int(value[0]) < UNLIMITED:
+            limits.append(int(value[0]))
+    return min(limits, default=None)
+
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def limits():
+    mem = memory_limit()
+    return {'cpu_quota': cpu_quota(), 'cpus': available_cpus(), 'memory_mb': mem / 2**20 if mem else None}
+
+def auto_workers(lim, worker_mb=WORKER_MB):
+    """Pool size for limits() (see the module docstring)."""
+    workers = lim['cpus']
+    if lim['cpu_quota'] is not None:
+        workers = min(workers, max(1, math.floor(lim['cpu_quota'])))
+    if lim['memory_mb'] is not None:
+        workers = min(workers, max(1, int((lim['memory_mb'] - PARENT_MB) // worker_mb)))
+    return workers
+
+# ---------- warm-up ----------
+
+def preload(extractor, classifier=None):
+    """Import extractor and load its model in this process (see batch_runner.load_extractor)."""
+    return batch_runner.load_extractor(extractor, classifier or 'features')
+
+def warm():
+    """Image build step: import every extractor, load its model and extract a one-page PDF with it."""
+    import fitz
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), 'Introduction', fontsize=18)
+    page.insert_text((72, 100), 'Body text of the warm-up page.', fontsize=10)
+    pdf = doc.tobytes()
+    for extractor in batch_runner.EXTRACTORS:
+        preload(extractor).extract_outline(pdf)
+    importlib.import_module('heading_index')
+    print(f'[✓] warm: {", ".join(batch_runner.EXTRACTORS)} imported and run in {timings.report()["total_ms"]:.0f} ms')
+
+if __name__ == '__main__':
+    ap = batch_runner.parser()
+    ap.description = 'Run an outline extractor over a mounted directory of PDFs, sized to the container.'
+    ap.add_argument('--worker-mb', type=float, default=WORKER_MB, help='memory to reserve per worker when sizing the pool')
+    ap.add_argument('--limits', action='store_true', help='print the detected limits and pool size, then exit')
+    ap.add_argument('--warm', action='store_true', help='image build step: import and run every extractor once, then exit')
+    args = ap.parse_args()
+    batch_runner.check_args(ap, args)
+    if args.warm:
+        warm()
+        sys.exit(0)
+    lim = limits()
+    if args.workers is None:
+        args.workers = auto_workers(lim, args.worker_mb)
+    if args.limits:
+        print(json.dumps(dict(lim, workers=args.workers)))
+        sys.exit(0)
+    if mp.get_start_method() == 'fork':
+        preload(args.extractor, args.classifier)  # inherited by the forked workers
+    timings.mark_ready()
+
+    summary = batch_runner.run(args)
+    wall = summary['wall_secs']
+    print('[container] ' + json.dumps({
+        **lim,
+        'workers': summary['workers'],
+        'files': summary['files'],
+        'failed': summary['failed'],
+        'pages': summary['pages'],
+        'wall_secs': round(wall, 3),
+        'files_per_sec': round(summary['files'] / wall, 2) if wall > 0 else 0.0,
+        'pages_per_sec': round(summary['pages_per_sec'], 2),
+        'first_result_secs': summary['first_result_secs'] and round(summary['first_result_secs'], 3),
+        'startup_ms': timings.report()['startup_ms'],
+    }))
+    sys.exit(1 if summary['failed'] else 0)
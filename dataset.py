@@ -0,0 +1,147 @@
+"""
+Feature dataset builder for train.py.
+
+    python dataset.py --labels labels.csv --pdf-dir input --workers 4
+
+Labels are grouped by file.  Each PDF is parsed once, in a process pool,
+into the feature vector of every text line (lines as gemini sees them), and
+the result is cached as <cache_dir>/<pdf sha256>-v<FEATURE_VERSION>.npz, so
+a later run only parses new or changed PDFs and adding labels costs a dict
+lookup per label.  Labels are joined on (page, text).  Labels whose line
+isn't in the PDF (or whose PDF isn't in pdf_dir) are looked up in the
+outline JSON in json_dir, which is what train.py used to read for every
+label.
+"""
+import argparse, json, os, re, sys
+from concurrent.futures import ProcessPoolExecutor
+
+CACHE_DIR = '.feature_cache'
+FEATURE_VERSION = 1  # bump when extract_features or line_stats change
+FEATURE_NAMES = ['font_size', 'is_bold', 'is_numbered', 'is_colon',
+                 'word_count', 'stop_ratio', 'starts_upper', 'ends_punct']
+STOPS = {"and","the","of","in","to","for","with","on","by","at","from"}
+
+def extract_features(span):
+    text = span.get("text","")
+    fs   = span.get("font_size",0)
+    fonts= span.get("font",[])
+    is_bold     = int(any("Bold" in f for f in fonts))
+    is_numbered = int(bool(re.match(r'^\d+(?:\.\d+)*\b', text)))
+    is_colon    = int(text.endswith(':'))
+    words = text.split()
+    wc    = len(words)
+    stop_ratio  = sum(w.lower() in STOPS for w in words)/max(1,wc)
+    starts_upper= int(bool(re.match(r'^[A-Z0-9]', text)))
+    ends_punct  = int(text.endswith(('.', '?', '!')))
+    return [fs, is_bold, is_numbered, is_colon, wc, stop_ratio, starts_upper, ends_punct]
+
+# ---------- per-PDF feature tables ----------
+
+def pdf_lines(pdf_path):
+    """(page, text, features) for every non-empty text line of a PDF."""
+    import fitz
+    from gemini import line_stats
+    from page_text import text_blocks
+    rows = []
+    doc = fitz.open(pdf_path)
+    for pno, page in enumerate(doc, 1):
+        for blk in text_blocks(page):
+            for line in blk.get('lines', []):
+                text, fs, fonts = line_stats(line)
+                if text:
+                    rows.append((pno, text, extract_features({'text': text, 'font_size': fs, 'font': fonts})))
+    return rows
+
+def cache_path(pdf_path, cache_dir=CACHE_DIR):
+    from result_cache import file_digest
+    return os.path.join(cache_dir, f'{file_digest(pdf_path)}-v{FEATURE_VERSION}.npz')
+
+def _build_table(pdf_path, cache_dir):
+    """Worker: parse one PDF and write its feature table; returns the cache path, or None if unreadable."""
+    import numpy as np
+    try:
+        rows = pdf_lines(pdf_path)
+    except Exception:
+        return None  # e.g. encrypted; build_dataset falls back to the outline JSON
+    path = cache_path(pdf_path, cache_dir)
+    tmp = path[:-4] + f'.{os.getpid()}.tmp.npz'
+    np.savez_compressed(tmp,
+                        page=np.array([r[0] for r in rows], dtype=np.int32),
+                        text=np.array([r[1] for r in rows], dtype=str),
+                        X=np.array([r[2] for r in rows], dtype=np.float64).reshape(-1, len(FEATURE_NAMES)))
+    os.replace(tmp, path)
+    return path
+
+def load_index(path):
+    """{(page, text): feature row} for a cached table; the first occurrence of a line wins."""
+    import numpy as np
+    with np.load(path) as z:
+        page, text, X = z['page'], z['text'], z['X']
+    index = {}
+    for key, row in zip(zip(page.tolist(), text.tolist()), X):
+        index.setdefault(key, row)
+    return index
+
+def json_index(json_path):
+    """Fallback index from an extractor's outline JSON (font names aren't stored there)."""
+    with open(json_path, encoding='utf-8') as fp:
+        data = json.load(fp)
+    index = {}
+    for span in data.get('outline', []):
+        index.setdefault((span['page'], span['text']), extract_features(dict(span, font=[])))
+    return index
+
+# ---------- dataset ----------
+
+def build_dataset(label_csv='labels.csv', pdf_dir='input', json_dir='output', cache_dir=CACHE_DIR, workers=None):
+    """Return (X, y, missing): feature matrix, labels, and the label rows that couldn't be matched."""
+    import numpy as np
+    import pandas as pd
+    labels = pd.read_csv(label_csv)
+    files = {f: os.path.join(pdf_dir, os.path.basename(f)) for f in labels['file'].unique()}
+    pdfs = {f: p for f, p in files.items() if os.path.isfile(p)}
+
+    # parse only the PDFs without a cached table
+    os.makedirs(cache_dir, exist_ok=True)
+    todo = sorted({p for p in pdfs.values() if not os.path.exists(cache_path(p, cache_dir))})
+    if todo:
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(todo))) as pool:
+            for p, built in zip(todo, pool.map(_build_table, todo, [cache_dir] * len(todo))):
+                if built is None:
+                    pdfs = {f: q for f, q in pdfs.items() if q != p}
+
+    X, y, missing = [], [], []
+    for f, group in labels.groupby('file', sort=False):
+        json_path = os.path.join(json_dir, os.path.splitext(os.path.basename(f))[0] + '.json')
+        indexes = [lambda: load_index(cache_path(pdfs[f], cache_dir))] if f in pdfs else []
+        indexes.append(lambda: json_index(json_path) if os.path.isfile(json_path) else {})
+        todo = list(zip(group['page'], group['text'], group['label']))
+        # PDF lines first; whatever isn't found there (e.g. text from an OCR'd outline) is looked up in the JSON
+        for load in indexes:
+            if not todo:
+                break
+            index, rest = load(), []
+            for page, text, label in todo:
+                row = index.get((int(page), text))
+                if row is None:
+                    rest.append((page, text, label))
+                    continue
+                X.append(row)
+                y.append(int(label))
+            todo = rest
+        missing.extend((f, int(page), text) for page, text, _ in todo)
+    X = np.array(X, dtype=np.float64).reshape(-1, len(FEATURE_NAMES))
+    return X, np.array(y, dtype=np.int64), missing
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Build (and cache) the heading-classifier training features.')
+    ap.add_argument('--labels', default='labels.csv')
+    ap.add_argument('--pdf-dir', default='input')
+    ap.add_argument('--json-dir', default='output')
+    ap.add_argument('--cache-dir', default=CACHE_DIR)
+    ap.add_argument('--workers', type=int, default=None)
+    args = ap.parse_args()
+    X, y, missing = build_dataset(args.labels, args.pdf_dir, args.json_dir, args.cache_dir, args.workers)
+    print(f'{len(y)} labelled rows, {len(missing)} unmatched', file=sys.stderr)
+    for f, page, text in missing:
+        print(f'  unmatched: {f} p{page} {text!r}', file=sys.stderr)
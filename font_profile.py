@@ -0,0 +1,227 @@
+"""
+Document font statistics, computed in one pass and cached in a sidecar file.
+
+    python font_profile.py input/NEP2020_Rural_Development.pdf
+
+The profile is a histogram over (size, bold, font) with span and character
+counts.  Percentiles are computed from the histogram with numpy's default
+(linear) interpolation, so they are exact as long as the number of distinct
+sizes stays under max_bins; past that, sizes are merged into coarser bins
+and the profile is marked approximate.  The sidecar
+(<pdf>.fontprofile.json) records the PDF's content hash and is ignored once
+the PDF changes.  Sidecars are written by this script (profile_for's
+persist=True) and by main_debug.debug_font_sizes; extractors reuse one when
+it exists, and otherwise don't hash the PDF at all.
+"""
+import bisect, json, math, os, sys
+from collections import Counter
+from page_text import text_blocks
+
+MAX_BINS = 4096
+SIDECAR_SUFFIX = '.fontprofile.json'
+BOLD_FLAG = 16  # PyMuPDF span flag bit for bold
+
+class FontProfile:
+    def __init__(self, max_bins=MAX_BINS):
+        self.max_bins = max_bins
+        self.precision = None  # decimals sizes are rounded to once the histogram is compressed
+        self.spans = Counter()  # (size, bold, font) -> span count
+        self.chars = Counter()  # (size, bold, font) -> character count
+        self._sizes = None
+
+    @property
+    def exact(self):
+        return self.precision is None
+
+    # ---------- building ----------
+
+    def add(self, size, bold=False, font='', chars=0):
+        if self.precision is not None:
+            size = round(size, self.precision)
+        key = (size, bool(bold), font)
+        self.spans[key] += 1
+        self.chars[key] += chars
+        self._sizes = None
+        if len(self.spans) > self.max_bins:
+            self._compress()
+
+    def add_span(self, span):
+        self.add(span.get('size', 0), span.get('flags', 0) & BOLD_FLAG, span.get('font', ''), len(span.get('text', '')))
+
+    def update(self, other):
+        """Add another profile's counts (e.g. of another page range); exact while neither is compressed."""
+        for key, n in other.spans.items():
+            size, bold, font = key
+            if self.precision is not None:
+                size = round(size, self.precision)
+            self.spans[(size, bold, font)] += n
+            self.chars[(size, bold, font)] += other.chars[key]
+        self._sizes = None
+        if len(self.spans) > self.max_bins:
+            self._compress()
+
+    def add_page(self, page):
+        for block in text_blocks(page):
+            for line in block.get('lines', []):
+                for span in line.get('spans', []):
+                    self.add_span(span)
+
+    def _compress(self):
+        # drop one decimal of size precision at a time until the histogram fits again
+        while len(self.spans) > self.max_bins:
+            self.precision = 2 if self.precision is None else self.precision - 1
+            for counter in (self.spans, self.chars):
+                merged = Counter()
+                for (size, bold, font), n in counter.items():
+                    merged[(round(size, self.precision), bold, font)] += n
+                counter.clear()
+                counter.update(merged)
+
+    # ---------- queries ----------
+
+    def size_histogram(self, nonzero=False):
+        hist = Counter()
+        for (size, _, _), n in self.spans.items():
+            if size or not nonzero:
+                hist[size] += n
+        return hist
+
+    def _sorted_sizes(self, nonzero):
+        if self._sizes is None:
+            self._sizes = {}
+        if nonzero not in self._sizes:
+            hist = self.size_histogram(nonzero)
+            values = sorted(hist)
+            cum, total = [], 0
+            for v in values:
+                total += hist[v]
+                cum.append(total)
+            self._sizes[nonzero] = (values, cum)
+        return self._sizes[nonzero]
+
+    def count(self, nonzero=False):
+        _, cum = self._sorted_sizes(nonzero)
+        return cum[-1] if cum else 0
+
+    def _at_rank(self, rank, nonzero):
+        values, cum = self._sorted_sizes(nonzero)
+        return values[bisect.bisect_right(cum, rank)]
+
+    def percentile(self, q, nonzero=True):
+        """Same interpolation as numpy.percentile's default; None for an empty profile."""
+        n = self.count(nonzero)
+        if not n:
+            return None
+        vi = (n - 1) * (q / 100)
+        lo = math.floor(vi)
+        if lo >= n - 1:
+            return self._at_rank(n - 1, nonzero)
+        t = vi - lo
+        a, b = self._at_rank(lo, nonzero), self._at_rank(lo + 1, nonzero)
+        d = b - a
+        return b - d * (1 - t) if t >= 0.5 else a + d * t
+
+    def max_size(self, default=None):
+        values, _ = self._sorted_sizes(False)
+        return values[-1] if values else default
+
+    def min_size(self, default=None):
+        values, _ = self._sorted_sizes(False)
+        return values[0] if values else default
+
+    def body_size(self):
+        """Size carrying the most characters (the running-text size)."""
+        by_size = Counter()
+        for (size, _, _), n in self.chars.items():
+            by_size[size] += n
+        return max(by_size, key=lambda s: (by_size[s], -s)) if by_size else None
+
+    def heading_tiers(self, min_step=0.5):
+        """Distinct sizes above the body size, largest first, merging sizes closer than min_step."""
+        body = self.body_size()
+        if body is None:
+            return []
+        tiers = []
+        for size in sorted(self.size_histogram(True), reverse=True):
+            if size > body and (not tiers or tiers[-1] - size >= min_step):
+                tiers.append(size)
+        return tiers
+
+    def summary(self):
+        return {
+            'spans': self.count(),
+            'exact': self.exact,
+            'min_size': self.min_size(),
+            'max_size': self.max_size(),
+            'body_size': self.body_size(),
+            'percentiles': {q: self.percentile(q) for q in (10, 20, 50, 80, 90)},
+            'heading_tiers': self.heading_tiers(),
+        }
+
+    # ---------- persistence ----------
+
+    def to_dict(self):
+        return {
+            'max_bins': self.max_bins,
+            'precision': self.precision,
+            'bins': [[size, bold, font, n, self.chars[(size, bold, font)]] for (size, bold, font), n in self.spans.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        prof = cls(data.get('max_bins', MAX_BINS))
+        prof.precision = data.get('precision')
+        for size, bold, font, n, chars in data['bins']:
+            prof.spans[(size, bold, font)] = n
+            prof.chars[(size, bold, font)] = chars
+        return prof
+
+def build_profile(doc, max_bins=MAX_BINS, budget=None):
+    prof = FontProfile(max_bins)
+    for page in budget.pages(doc) if budget else doc:
+        prof.add_page(page)
+    return prof
+
+def sidecar_path(pdf_path):
+    return pdf_path + SIDECAR_SUFFIX
+
+def load_sidecar(pdf_path):
+    """The cached profile for pdf_path, or None if missing or stale."""
+    from result_cache import file_digest
+    try:
+        with open(sidecar_path(pdf_path), encoding='utf-8') as fp:
+            data = json.load(fp)
+        if data.get('pdf_sha256') != file_digest(pdf_path):
+            return None
+        return FontProfile.from_dict(data)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+def save_sidecar(pdf_path, prof):
+    from result_cache import file_digest
+    data = dict(prof.to_dict(), pdf_sha256=file_digest(pdf_path), summary=prof.summary())
+    try:
+        with open(sidecar_path(pdf_path), 'w', encoding='utf-8') as fp:
+            json.dump(data, fp)
+    except OSError:
+        pass  # read-only input directory: the profile is just not cached
+
+def profile_for(doc, pdf_path=None, persist=False, budget=None):
+    """Font profile for an open document, reusing a fresh sidecar when one exists (budget: see memory_budget)."""
+    pdf_path = pdf_path or getattr(doc, 'name', None)
+    has_file = bool(pdf_path) and os.path.isfile(pdf_path)
+    prof = load_sidecar(pdf_path) if has_file else None
+    if prof is None:
+        prof = build_profile(doc, budget=budget)
+        if persist and has_file:
+            save_sidecar(pdf_path, prof)
+    return prof
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print('Usage: python font_profile.py <input.pdf>')
+        sys.exit(1)
+    import fitz
+    pdf = sys.argv[1]
+    prof = profile_for(fitz.open(pdf), pdf, persist=True)
+    print(json.dumps(prof.summary(), indent=2))
@@ -0,0 +1,129 @@
+"""
+NumPy-only evaluator for the heading RandomForest.
+
+    python forest.py heading_model.pkl            # -> heading_model.npz
+
+export_forest() flattens a fitted sklearn RandomForestClassifier into plain
+arrays: every tree's nodes are concatenated (children re-based to global
+node ids, leaves marked -1) with a per-node class-probability row.
+ForestModel walks all trees for a whole batch at once and reproduces
+sklearn's predict/predict_proba exactly: features are compared as float32
+like sklearn's trees do, leaf rows are the ones
+DecisionTreeClassifier.predict_proba returns for the exporting sklearn
+version, and tree probabilities are summed in estimator order before
+dividing by the number of trees.  Only numpy is
+needed at inference time; sklearn is needed only to export.
+"""
+import sys
+import numpy as np
+
+TREE_LEAF = -1
+
+def export_forest(clf, path, source_sha256=''):
+    """
+    Write a fitted single-output RandomForestClassifier to path (.npz); source_sha256 records which
+    pickle it came from, so heading_classifier can tell a stale export from a current one.
+    """
+    if getattr(clf, 'n_outputs_', 1) != 1:
+        raise ValueError('only single-output forests can be exported')
+    import sklearn
+    # sklearn >= 1.4 stores class fractions in tree_.value and returns them as is; before that the
+    # values were counts that DecisionTreeClassifier.predict_proba normalised per row
+    normalise = tuple(int(v) for v in sklearn.__version__.split('.')[:2]) < (1, 4)
+    n_classes = len(clf.classes_)
+    feature, threshold, left, right, missing_left, value, roots = [], [], [], [], [], [], []
+    offset = 0
+    for est in clf.estimators_:
+        t = est.tree_
+        roots.append(offset)
+        feature.append(t.feature)
+        threshold.append(t.threshold)
+        leaf = t.children_left == TREE_LEAF
+        left.append(np.where(leaf, TREE_LEAF, t.children_left + offset))
+        right.append(np.where(leaf, TREE_LEAF, t.children_right + offset))
+        # sklearn >= 1.3 routes NaN per node; before that NaN always went right
+        mgl = getattr(t, 'missing_go_to_left', None)
+        missing_left.append(np.zeros(t.node_count, dtype=bool) if mgl is None else mgl.astype(bool))
+        proba = t.value[:, 0, :n_classes].astype(np.float64)
+        if normalise:
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer
+        value.append(proba)
+        offset += t.node_count
+    np.savez_compressed(
+        path,
+        feature=np.concatenate(feature).astype(np.int32),
+        threshold=np.concatenate(threshold).astype(np.float64),
+        left=np.concatenate(left).astype(np.int32),
+        right=np.concatenate(right).astype(np.int32),
+        missing_left=np.concatenate(missing_left),
+        value=np.concatenate(value),
+        roots=np.array(roots, dtype=np.int32),
+        classes=np.asarray(clf.classes_),
+        n_features=np.int32(clf.n_features_in_),
+        source_sha256=np.str_(source_sha256),
+    )
+
+class ForestModel:
+    def __init__(self, arrays):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.missing_left = arrays['missing_left']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.classes_ = arrays['classes']
+        self.n_features_in_ = int(arrays['n_features'])
+        self.source_sha256 = str(arrays.get('source_sha256', ''))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as z:
+            return cls({k: z[k] for k in z.files})
+
+    def apply(self, X):
+        """Leaf node id of every (row, tree): all trees descend together, one level per step."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f'expected shape (n, {self.n_features_in_}), got {X.shape}')
+        n, n_trees = len(X), len(self.roots)
+        flat_x = X.ravel()
+        node = np.tile(self.roots, n)  # row-major (row, tree)
+        row_base = np.repeat(np.arange(n, dtype=np.int64) * X.shape[1], n_trees)
+        active = np.flatnonzero(self.left[node] != TREE_LEAF)
+        while len(active):
+            nd = node[active]
+            x = flat_x[row_base[active] + self.feature[nd]]
+            go_left = x <= self.threshold[nd]  # float32 vs float64 threshold, as in sklearn's trees
+            nan = np.isnan(x)
+            if nan.any():
+                go_left[nan] = self.missing_left[nd][nan]
+            nd = np.where(go_left, self.left[nd], self.right[nd])
+            node[active] = nd
+            active = active[self.left[nd] != TREE_LEAF]
+        return node.reshape(n, n_trees)
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        # summing over the leading (tree) axis adds the trees one after another, in estimator
+        # order, which is how sklearn accumulates them
+        proba = self.value[leaves.T].sum(axis=0)
+        proba /= leaves.shape[1]
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3):
+        print('Usage: python forest.py <model.pkl> [out.npz]')
+        sys.exit(1)
+    import os, pickle
+    from result_cache import file_digest
+    src = sys.argv[1]
+    dst = sys.argv[2] if len(sys.argv) == 3 else os.path.splitext(src)[0] + '.npz'
+    with open(src, 'rb') as fp:
+        export_forest(pickle.load(fp), dst, file_digest(src))
+    print(f'Exported {src} -> {dst}')
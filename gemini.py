@@ -1,9 +1,17 @@
-import fitz, json, os, re, pickle
-import pandas as pd
+import json, re
+from itertools import chain, groupby
+from font_profile import profile_for
+from heading_classifier import BATCH_SIZE, drop_rejected, load_model, model_for, predict_batched
+from jsonl_stream import page_records, write_jsonl
+from layout import line_layout
+from header_footer import HeaderFooterStream, page_number_key, y_bucket
+from memory_budget import MemoryBudget, SpillList
+from native_toc import toc_outline
+from page_text import band_clip, text_blocks
+from pdf_source import open_source, source_title
+from profiling import NULL_METRICS
 
-MODEL_PATH = 'heading_model.pkl'
-with open(MODEL_PATH, 'rb') as mf:
-    clf = pickle.load(mf)
+MODEL_PATH = 'heading_model.pkl'  # loaded lazily by heading_classifier.load_model
 
 stops = {"and","the","of","in","to","for","with","on","by","at","from"}
 
@@ -22,11 +30,21 @@ def extract_features(span):
         int(text.endswith(('.', '?', '!')))
     ]
 
+def line_stats(line):
+    """(stripped text, character-weighted average font size, fonts) of a 'dict' line."""
+    spans = line.get('spans', [])
+    text = ''.join(s['text'] for s in spans).strip()
+    if not spans:
+        return text, 0, []
+    total_chars = sum(len(s['text']) for s in spans)
+    avg_fs = sum(s['size'] * len(s['text']) for s in spans) / total_chars if total_chars else spans[0]['size']
+    return text, avg_fs, list({s['font'] for s in spans})
+
 # ---------- heuristic heading check ----------
 
 def heuristic_heading(text, prev_blank, next_blank, fs, max_fs, is_centered, all_caps):
     reasons = []
-    if prev_blank or next_blank:
+    if prev_blank and next_blank:
         reasons.append('surrounded by blank line')
     if fs >= (max_fs - 0.5):
         reasons.append(f'large font {fs}')
@@ -44,92 +62,273 @@ def heuristic_heading(text, prev_blank, next_blank, fs, max_fs, is_centered, all
 
 # ---------- main extractor ----------
 
-def extract_outline(pdf_path, header_footer_thresh=0.1, table_span_thresh=10):
-    doc = fitz.open(pdf_path)
-    if doc.is_encrypted and not doc.authenticate(''):
-        title = os.path.splitext(os.path.basename(pdf_path))[0]
-        return {'title': title, 'outline': []}
+def font_size_range(doc, budget=None):
+    # from the document's font profile; a fresh <pdf>.fontprofile.json sidecar (python font_profile.py)
+    # skips the extra pass, but extraction never writes one: the input directory may be read-only
+    prof = profile_for(doc, budget=budget)
+    return prof.max_size(12), prof.min_size(10)
+
+def page_lines(blocks, page_rect, header_footer_thresh=0.1, table_span_thresh=10, keep_band=False):
+    """
+    The part of a page's analysis that doesn't depend on the rest of the document.
+    Returns (lines, margins, n_spans, n_lines): lines holds (text, avg font size, fonts, is_centered,
+    blank above, blank below) for each line that can become a heading, in page order (duplicates of
+    earlier pages included), with the layout flags from layout.line_layout over all the page's kept
+    lines; margins the (text, y-bucket) signatures of header/footer band lines.  Band blocks are
+    skipped unless keep_band (header_footer='repeat').
+    """
+    lines, boxes, margins = [], [], set()
+    n_spans = n_lines = 0
+    page_height = page_rect.height
+    for blk in blocks:
+        # Skip headers / footers
+        in_band = blk['bbox'][1] < page_height * header_footer_thresh or blk['bbox'][3] > page_height * (1 - header_footer_thresh)
+        if in_band and not keep_band:
+            continue
+        if 'lines' not in blk:
+            continue
+        for line in blk['lines']:
+            # skip likely table rows (many tiny spans), but keep them as neighbours for the layout
+            n_lines += 1
+            n_spans += len(line.get('spans', []))
+            if len(line.get('spans', [])) > table_span_thresh:
+                boxes.append(line['bbox'])
+                continue
 
-    title = (doc.metadata or {}).get('title', os.path.splitext(os.path.basename(pdf_path))[0])
+            full_text, avg_fs, fonts = line_stats(line)
+            if in_band and full_text:
+                margins.add((full_text, y_bucket(line['bbox'][1])))
+            if not full_text:
+                continue
+            if len(full_text) <= 250:
+                lines.append((len(boxes), full_text, avg_fs, fonts))
+            boxes.append(line['bbox'])
+    if not lines:
+        return [], margins, n_spans, n_lines
+    lay = line_layout(boxes, page_rect.width)
+    centered, above, below = lay['centered'].tolist(), lay['blank_above'].tolist(), lay['blank_below'].tolist()
+    lines = [(text, avg_fs, fonts, centered[i], above[i], below[i]) for i, text, avg_fs, fonts in lines]
+    return lines, margins, n_spans, n_lines
 
-    # collect font sizes
-    sizes = [s['size'] for p in doc for b in p.get_text('dict')['blocks'] for l in b.get('lines', []) for s in l.get('spans', [])]
-    max_fs, min_fs = max(sizes, default=12), min(sizes, default=10)
+def page_outline(pno, lines, seen, max_fs, min_fs, classifier='features'):
+    """
+    Heuristics and levels for one page's lines given the document's font range; texts already in
+    seen (from earlier pages) are skipped and new ones added.  Returns (outline, pending, n_hits):
+    pending holds the (index, features or text) of the entries the model still has to accept.
+    """
+    outline, pending = [], []
+    n_hits = 0
+    for full_text, avg_fs, fonts, is_centered, prev_blank, next_blank in lines:
+        if full_text in seen:
+            continue
+        seen.add(full_text)
+        all_caps = full_text.isupper()
 
-    outline, seen = [], set()
+        hhit, h_reasons = heuristic_heading(full_text, prev_blank, next_blank, avg_fs, max_fs, is_centered, all_caps)
+        reasons = []
+        if hhit:
+            n_hits += 1
+            reasons.extend(h_reasons)
+        else:
+            # decided later in one batched predict call
+            pending.append((len(outline), full_text if classifier == 'text' else
+                            extract_features({'text':full_text,'font_size':avg_fs,'font':fonts})))
+            reasons.append('ML classifier positive')
 
-    for pno, page in enumerate(doc, 1):
-        page_width = page.rect.width
-        page_height = page.rect.height
+        # assign level H1‑H4
+        if avg_fs >= (max_fs - 0.5):
+            lvl = 'H1'
+        elif re.match(r'^\d+(?:\.\d+)*\b', full_text) or full_text.endswith(':'):
+            lvl = 'H2'
+        elif full_text.strip().startswith(('**','-')) or avg_fs >= (min_fs + 1.5):
+            lvl = 'H3'
+        else:
+            lvl = 'H4'
 
-        raw_blocks = page.get_text('dict')['blocks']
-        for blk in raw_blocks:
-            # Skip headers / footers
-            if blk['bbox'][1] < page_height * header_footer_thresh or blk['bbox'][3] > page_height * (1 - header_footer_thresh):
-                continue
-            if 'lines' not in blk:
-                continue
-            for line in blk['lines']:
-                # skip likely table rows (many tiny spans)
-                if len(line.get('spans', [])) > table_span_thresh:
-                    continue
-
-                full_text = ''.join(s['text'] for s in line.get('spans', [])).strip()
-                if not full_text or full_text in seen or len(full_text) > 250:
-                    continue
-                seen.add(full_text)
-
-                # compute average font size for the line
-                total_chars = sum(len(s['text']) for s in line['spans'])
-                avg_fs = sum(s['size'] * len(s['text']) for s in line['spans']) / total_chars if total_chars else line['spans'][0]['size']
-                fonts = list({s['font'] for s in line['spans']})
-
-                # centered?
-                x0, x1 = line['bbox'][0], line['bbox'][2]
-                line_center = (x0 + x1) / 2
-                is_centered = abs(line_center - page_width / 2) < page_width * 0.2
-                all_caps = full_text.isupper()
-
-                prev_blank = False  # compute via simple heuristic using y positions
-                next_blank = False
-                # (For speed, we rely on blank‑line detection from earlier passes, acceptable for hackathon spec)
-
-                hhit, h_reasons = heuristic_heading(full_text, prev_blank, next_blank, avg_fs, max_fs, is_centered, all_caps)
-                reasons = []
-                if hhit:
-                    reasons.extend(h_reasons)
-                else:
-                    feats = extract_features({'text':full_text,'font_size':avg_fs,'font':fonts})
-                    if clf.predict(pd.DataFrame([feats]))[0] == 1:
-                        reasons.append('ML classifier positive')
-                    else:
-                        continue
-
-                # assign level H1‑H4
-                if avg_fs >= (max_fs - 0.5):
-                    lvl = 'H1'
-                elif re.match(r'^\d+(?:\.\d+)*\b', full_text) or full_text.endswith(':'):
-                    lvl = 'H2'
-                elif full_text.strip().startswith(('**','-')) or avg_fs >= (min_fs + 1.5):
-                    lvl = 'H3'
-                else:
-                    lvl = 'H4'
-
-                outline.append({
-                    'level': lvl,
-                    'text': full_text,
-                    'page': pno,
-                    'font_size': round(avg_fs,1),
-                    'reason': '; '.join(reasons)
-                })
+        outline.append({
+            'level': lvl,
+            'text': full_text,
+            'page': pno,
+            'font_size': round(avg_fs,1),
+            'reason': '; '.join(reasons)
+        })
+    return outline, pending, n_hits
+
+def iter_outline(doc, header_footer_thresh=0.1, table_span_thresh=10, batch_size=BATCH_SIZE,
+                 header_footer='band', metrics=NULL_METRICS, clip_bands=False, classifier='features', budget=None):
+    """
+    Yield (page number, headings) for each page of an open document, as soon as the page is done.
+    header_footer='band' drops everything in the top/bottom header_footer_thresh of the page;
+    'repeat' only drops band lines that repeat across pages (pages then arrive a few pages late).
+    clip_bands=True (band mode only) doesn't parse the bands at all; a block straddling a band edge
+    then keeps its inner lines instead of being dropped whole.
+    classifier='text' scores undecided lines with the text model (traingemini.py) instead of the
+    8-feature model; either way each page's lines go to the model in one batch.
+    budget (a memory_budget.MemoryBudget) reads the pages chunk by chunk from short-lived copies of doc.
+    """
+    with metrics.stage('font_stats'):
+        max_fs, min_fs = font_size_range(doc, budget)
+    seen = set()
+    detector = HeaderFooterStream(key=page_number_key) if header_footer == 'repeat' else None
+    clip = clip_bands and detector is None
+    model_path = model_for(classifier, MODEL_PATH)
+
+    for pno, page in enumerate(budget.pages(doc) if budget else doc, 1):
+        with metrics.stage('get_text'):
+            raw_blocks = text_blocks(page, band_clip(page, header_footer_thresh) if clip else None)
+        t_lines = metrics.clock()
+        lines, margins, n_spans, n_lines = page_lines(raw_blocks, page.rect, header_footer_thresh, table_span_thresh,
+                                                      keep_band=detector is not None)
+        raw_blocks = None  # the page's text dict isn't needed past this point
+        outline, pending, n_hits = page_outline(pno, lines, seen, max_fs, min_fs, classifier)
+        metrics.lap('heuristics', t_lines)
+        metrics.count('pages')
+        metrics.count('pages_skipped', not n_lines)
+        metrics.count('spans', n_spans)
+        metrics.count('lines', n_lines)
+        metrics.count('candidates', len(outline))
+        metrics.count('heuristic_hits', n_hits)
+        outline = drop_rejected(outline, pending, model_path, batch_size, metrics)
+        if detector is None:
+            yield pno, outline
+        else:
+            yield from detector.push(pno, margins, [(h['text'], h) for h in outline])
+    if detector is not None:
+        yield from detector.flush()
 
+# ---------- per-page records (incremental / sharded extraction) ----------
+
+def page_record(page, header_footer_thresh=0.1, table_span_thresh=10, keep_band=False, clip=False):
+    """What iter_outline needs from one page that doesn't depend on the other pages, as a JSON-able dict."""
+    blocks = text_blocks(page)
+    sizes = [s['size'] for b in blocks for line in b.get('lines', ()) for s in line.get('spans', ())]
+    if clip:
+        blocks = text_blocks(page, band_clip(page, header_footer_thresh))
+    lines, margins, _, _ = page_lines(blocks, page.rect, header_footer_thresh, table_span_thresh, keep_band)
+    return {
+        'sizes': [min(sizes), max(sizes)] if sizes else None,
+        'lines': lines,
+        'margins': sorted(margins),
+    }
+
+def label_key(features, classifier='features'):
+    # the line text for the text model, the feature vector otherwise
+    return features if classifier == 'text' else json.dumps(features)
+
+def outline_from_records(records, labels, model_path, classifier='features', batch_size=BATCH_SIZE,
+                         header_footer='band', metrics=NULL_METRICS, page_numbers=None):
+    """
+    The document-level half of iter_outline, over page_record()s in page order: the font size range
+    (as font_size_range would find it), duplicate lines, levels, repeated headers/footers, and the
+    model for undecided lines.  labels maps label_key() to the model's label; only missing keys are
+    predicted (in one batched pass) and added.  page_numbers gives the records' page numbers when
+    they aren't pages 1..n (see partial).  Returns (outline, the label keys used).
+    """
+    ranges = [rec['sizes'] for rec in records if rec['sizes']]
+    max_fs = max((hi for _, hi in ranges), default=12)
+    min_fs = min((lo for lo, _ in ranges), default=10)
+
+    t = metrics.clock()
+    seen, pages, todo = set(), [], {}
+    for pno, rec in zip(page_numbers or range(1, len(records) + 1), records):
+        outline, pending, _ = page_outline(pno, [tuple(line) for line in rec['lines']], seen, max_fs, min_fs, classifier)
+        keys = [label_key(f, classifier) for _, f in pending]
+        pages.append((pno, outline, [(i, k) for (i, _), k in zip(pending, keys)]))
+        todo.update((k, f) for k, (_, f) in zip(keys, pending) if k not in labels)
+    metrics.lap('heuristics', t)
+    if todo:
+        with metrics.stage('ml_predict'):
+            labels.update(zip(todo, predict_batched(load_model(model_path), list(todo.values()), batch_size)))
+    metrics.count('ml_lines', len(todo))
+
+    detector = HeaderFooterStream(key=page_number_key) if header_footer == 'repeat' else None
+    result, used = [], set()
+    for (pno, outline, pending), rec in zip(pages, records):
+        used.update(k for _, k in pending)
+        rejected = {i for i, k in pending if labels[k] != 1}
+        outline = [h for i, h in enumerate(outline) if i not in rejected]
+        if detector is None:
+            result.extend(outline)
+        else:
+            margins = {tuple(m) for m in rec['margins']}
+            result.extend(h for _, hs in detector.push(pno, margins, [(h['text'], h) for h in outline]) for h in hs)
+    if detector is not None:
+        result.extend(h for _, hs in detector.flush() for h in hs)
+    return result, used
+
+def open_pdf(pdf_path):
+    """Open a PDF (path or in-memory, see pdf_source) and return (doc, title); doc is None if it can't be decrypted."""
+    doc = open_source(pdf_path)
+    if doc.is_encrypted and not doc.authenticate(''):
+        return None, source_title(pdf_path)
+    return doc, (doc.metadata or {}).get('title', source_title(pdf_path))
+
+def extract_outline(pdf_path, header_footer_thresh=0.1, table_span_thresh=10, batch_size=BATCH_SIZE,
+                    toc='verify', header_footer='band', metrics=NULL_METRICS, clip_bands=False, classifier='features',
+                    max_rss_mb=None, page_cache=None, page_workers=None, pages=None, deadline=None):
+    """
+    max_rss_mb: keep memory flat on very long documents (chunked pages, spilled headings; see memory_budget).
+    page_cache: per-page fingerprint file; only pages changed since the last run are parsed (see incremental).
+    page_workers: parse page ranges in that many processes (see sharded); ignored with page_cache, and
+    replaces max_rss_mb (each worker only holds its own pages).
+    pages, deadline: read only those pages ('1-10,~10' or page numbers) / stop after that many seconds,
+    and mark the result complete or not (see partial); page_workers is then ignored.
+    """
+    if page_cache or pages is not None or deadline is not None:
+        from incremental import extract_outline as extract_incremental
+        return extract_incremental(pdf_path, page_cache, header_footer_thresh, table_span_thresh, batch_size, toc,
+                                   header_footer, metrics, clip_bands, classifier,
+                                   MemoryBudget(max_rss_mb, pdf_path) if max_rss_mb else None, pages, deadline)
+    if page_workers and page_workers > 1:
+        from sharded import extract_outline as extract_sharded
+        return extract_sharded(pdf_path, page_workers, header_footer_thresh, table_span_thresh, batch_size, toc,
+                               header_footer, metrics, clip_bands, classifier)
+    with metrics.stage('open'):
+        doc, title = open_pdf(pdf_path)
+    if doc is None:
+        return {'title': title, 'outline': []}
+    # embedded bookmarks, when present and plausible, replace the span analysis (see native_toc)
+    with metrics.stage('toc'):
+        native = toc_outline(doc, toc)
+    if native is not None:
+        metrics.count('toc_used')
+        return {'title': title, 'outline': native}
+    budget = MemoryBudget(max_rss_mb, pdf_path) if max_rss_mb else None
+    per_page = iter_outline(doc, header_footer_thresh, table_span_thresh, batch_size, header_footer, metrics,
+                            clip_bands, classifier, budget)
+    if budget is None:
+        outline = [h for _, page_outline in per_page for h in page_outline]
+        return {'title': title, 'outline': outline}
+    spill = SpillList(budget)
+    for _, page_outline in per_page:
+        spill.extend(page_outline)
+    doc.close()
+    budget.release()
+    outline = list(spill)
+    spill.close()
+    metrics.count('peak_rss_mb', budget.peak_mb())
+    metrics.count('chunks', budget.chunks)
+    metrics.count('spilled_headings', spill.spilled)
     return {'title': title, 'outline': outline}
 
+def stream_outline(pdf_path, jsonl_output, toc='verify', max_rss_mb=None, **kwargs):
+    """Write the outline as JSONL: a title line, then one line per page, flushed as each page finishes."""
+    if max_rss_mb:
+        kwargs['budget'] = MemoryBudget(max_rss_mb, pdf_path)
+    doc, title = open_pdf(pdf_path)
+    try:
+        native = toc_outline(doc, toc) if doc is not None else None
+        if native is not None:
+            pages = ((pno, list(hs)) for pno, hs in groupby(native, key=lambda h: h['page']))
+        else:
+            pages = iter_outline(doc, **kwargs) if doc is not None else ()
+        return write_jsonl(chain([{'title': title}], page_records(pages)), jsonl_output)
+    finally:
+        if doc is not None:
+            doc.close()
+
 if __name__ == '__main__':
-    in_dir, out_dir = 'input','output'
-    os.makedirs(out_dir, exist_ok=True)
-    for f in sorted(os.listdir(in_dir)):
-        if f.lower().endswith('.pdf'):
-            res = extract_outline(os.path.join(in_dir, f))
-            with open(os.path.join(out_dir, f.replace('.pdf','.json')),'w') as fp:
-                json.dump(res, fp, indent=2)
+    # input/ → output/, one worker process per core (see batch_runner.py for options)
+    import sys
+    from batch_runner import main as run_batch
+    sys.exit(run_batch(['--extractor', 'gemini'] + sys.argv[1:]))
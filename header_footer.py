@@ -0,0 +1,66 @@
+"""
+Incremental running-header/footer detection for page-by-page extraction.
+
+main1.repeated_header_ids needs every page before it can decide what
+repeats; this detector decides on the fly instead.  Callers push one page at
+a time with the (text, y-bucket) signatures found in that page's margins and
+the page's candidate items.  A signature counts as a header/footer when it
+occurs on more than min_ratio of the pages in a sliding window.  Pages are
+held back for `lag` further pages before being emitted, so an early guess
+can still be retracted (or a late-detected header removed) within that
+bound.  Memory is the window of signature sets plus at most `lag` pages.
+"""
+import re
+from collections import Counter, deque
+
+LAG = 8
+WINDOW = 50
+MIN_RATIO = 0.8
+
+def page_number_key(text):
+    # "Page 3 of 10" and "Page 4 of 10" share one signature
+    return re.sub(r'\d+', '#', text)
+
+def y_bucket(y, tolerance=5):
+    return round(y / tolerance) * tolerance
+
+class HeaderFooterStream:
+    def __init__(self, lag=LAG, window=WINDOW, min_ratio=MIN_RATIO, key=None):
+        self.lag = lag
+        self.min_ratio = min_ratio
+        self.key = key or (lambda text: text)  # text normalisation applied to signatures and items
+        self._window = deque(maxlen=window)  # per-page signature sets
+        self._counts = Counter()             # signature -> pages in window
+        self._pending = deque()              # (page, [(text, item), ...]) not yet emitted
+
+    def repeated_texts(self):
+        pages = len(self._window)
+        return {text for (text, _), n in self._counts.items() if pages and n / pages > self.min_ratio}
+
+    def push(self, page, signatures, items):
+        """
+        Add one page: signatures is a set of (text, y_bucket) seen in its margins, items is a list of
+        (text, item) candidates. Returns the (page, items) pairs that are now final.
+        """
+        if len(self._window) == self._window.maxlen:
+            self._counts.subtract(self._window[0])
+            self._counts += Counter()  # drop zero counts
+        self._window.append({(self.key(text), y) for text, y in signatures})
+        self._counts.update(self._window[-1])
+        self._pending.append((page, items))
+        ready = []
+        while len(self._pending) > self.lag:
+            ready.append(self._emit())
+        return ready
+
+    def flush(self):
+        """Emit every held-back page using the final statistics."""
+        ready = []
+        while self._pending:
+            ready.append(self._emit())
+        return ready
+
+    def _emit(self):
+        page, items = self._pending.popleft()
+        repeated = self.repeated_texts()
+        return page, [item for text, item in items if self.key(text) not in repeated]
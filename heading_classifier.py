@@ -0,0 +1,88 @@
+import os, pickle
+from functools import lru_cache
+from profiling import NULL_METRICS
+
+MODEL_PATH = 'heading_model.pkl'
+TEXT_MODEL_PATH = 'text_model.pkl'  # traingemini.py: TF-IDF + RandomForest over the line text
+CLASSIFIERS = ('features', 'text')
+BATCH_SIZE = 512  # rows per predict call; bounds the feature matrix for huge documents
+
+def model_for(classifier, features_path=MODEL_PATH):
+    """Model file for an extractor's classifier option ('features': 8-dim vector, 'text': raw line text)."""
+    if classifier not in CLASSIFIERS:
+        raise ValueError(f'classifier must be one of {CLASSIFIERS}, got {classifier!r}')
+    return features_path if classifier == 'features' else TEXT_MODEL_PATH
+
+# ---------- model loading (deferred until the ML fallback is needed) ----------
+
+def forest_path(model_path=MODEL_PATH):
+    return os.path.splitext(model_path)[0] + '.npz'
+
+def model_file(model_path=MODEL_PATH):
+    """
+    The file load_model reads: the NumPy export (see forest.py) if there is no pickle or it was
+    exported from this pickle, otherwise the pickle itself.
+    """
+    npz = forest_path(model_path)
+    if not os.path.exists(npz):
+        return model_path
+    if not os.path.exists(model_path):
+        return npz
+    from forest import ForestModel
+    from result_cache import file_digest
+    return npz if ForestModel.load(npz).source_sha256 == file_digest(model_path) else model_path
+
+@lru_cache(maxsize=None)
+def load_model(model_path=MODEL_PATH):
+    """
+    Load the classifier once per process; numpy (and sklearn, only when falling back to the pickle)
+    are only imported here.
+    """
+    path = model_file(model_path)
+    if path != model_path:
+        from forest import ForestModel
+        return ForestModel.load(path)
+    with open(model_path, 'rb') as mf:
+        model = pickle.load(mf)
+    if hasattr(model, 'steps'):
+        # a text Pipeline from traingemini.py: scored from the line text, with a memo
+        from text_classifier import TextModel
+        return TextModel(model)
+    return model
+
+# ---------- batched classification ----------
+
+def check_batch_size(batch_size):
+    """batch_size as rows per predict call: None means BATCH_SIZE; anything below 1 is a ValueError."""
+    if batch_size is None:
+        return BATCH_SIZE
+    if batch_size < 1:
+        raise ValueError(f'batch_size must be at least 1, got {batch_size!r}')
+    return int(batch_size)
+
+def predict_batched(clf, rows, batch_size=BATCH_SIZE):
+    """Predict labels for a list of feature vectors (or texts, for a TextModel) with one clf.predict call per batch."""
+    import numpy as np
+    batch_size = check_batch_size(batch_size)
+    preds = []
+    for start in range(0, len(rows), batch_size):
+        X = rows[start:start + batch_size]
+        if not getattr(clf, 'takes_text', False):
+            X = np.asarray(X, dtype=np.float64)
+        preds.extend(clf.predict(X).tolist())
+    return preds
+
+def drop_rejected(items, pending, model_path=MODEL_PATH, batch_size=BATCH_SIZE, metrics=NULL_METRICS):
+    """Classify pending (index, features) pairs and drop the items the model rejects."""
+    batch_size = check_batch_size(batch_size)
+    if not pending:
+        return items  # decided by heuristics alone: the model is never loaded
+    with metrics.stage('model_load'):
+        clf = load_model(model_path)
+    with metrics.stage('ml_predict'):
+        preds = predict_batched(clf, [f for _, f in pending], batch_size)
+    rejected = {i for (i, _), p in zip(pending, preds) if p != 1}
+    metrics.count('classifier_calls', -(-len(pending) // batch_size))
+    metrics.count('ml_lines', len(pending))
+    metrics.count('ml_rejected', len(rejected))
+    return [it for i, it in enumerate(items) if i not in rejected]
@@ -0,0 +1,276 @@
+"""
+Inverted index over the outline JSON files in an output directory.
+
+    python heading_index.py update output                   # (re)index new and changed files
+    python heading_index.py search output "rural development"
+    python heading_index.py search output intro --prefix --level H1 H2 --pages 1-20
+
+The index is one SQLite file (<output>/.headings.sqlite): a table of
+documents (file name, size and mtime, title, the id range of its headings),
+a table of headings (level, page, text) and an inverted index of token id
+-> heading id, kept as a WITHOUT ROWID key so it costs a few bytes per
+posting.  A query is a few B-tree lookups that stop at the limit, so it
+doesn't read any outline file.  update() only re-reads files whose size or mtime
+changed and drops files that are gone; batch_runner indexes every result as
+it is written (see --no-index there).
+
+Files with an 'outline' list (gemini, main_extractor) are indexed, as are
+main1's nested 'headings' (levels 1, 2, ... become 'H1', 'H2', ...).
+run_summary.json and the .metrics.json / .pages.json sidecars are skipped.
+"""
+import argparse, json, os, re, sqlite3, sys
+
+INDEX_NAME = '.headings.sqlite'
+SKIP_NAMES = {'run_summary.json'}
+SKIP_SUFFIXES = ('.metrics.json', '.pages.json')  # profiling / incremental sidecars
+TOKEN = re.compile(r'\w+')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY, file TEXT UNIQUE, size INTEGER, mtime_ns INTEGER, title TEXT, complete INTEGER,
+    first INTEGER, last INTEGER);
+CREATE TABLE IF NOT EXISTS headings (id INTEGER PRIMARY KEY, doc INTEGER, level TEXT, page INTEGER, text TEXT);
+CREATE INDEX IF NOT EXISTS headings_level_page ON headings (level, page);
+CREATE TABLE IF NOT EXISTS tokens (id INTEGER PRIMARY KEY, text TEXT UNIQUE);
+CREATE TABLE IF NOT EXISTS terms (token INTEGER, heading INTEGER, PRIMARY KEY (token, heading)) WITHOUT ROWID;
+'''
+
+def tokens(text):
+    return {t.lower() for t in TOKEN.findall(text)}
+
+def is_outline_file(name):
+    return name.endswith('.json') and name not in SKIP_NAMES and not name.endswith(SKIP_SUFFIXES)
+
+def flat_headings(result):
+    """(level, page, text) for each heading of an extractor result, in outline order."""
+    if isinstance(result.get('outline'), list):
+        for h in result['outline']:
+            yield str(h.get('level', '')), h.get('page'), h.get('text', '')
+        return
+    stack = list(reversed(result.get('headings') or []))  # main1: nested, depth-first
+    while stack:
+        h = stack.pop()
+        level = h.get('level', '')
+        yield f'H{level}' if isinstance(level, int) else str(level), h.get('page'), h.get('text', '')
+        stack.extend(reversed(h.get('children', [])))
+
+def _marks(n):
+    return ','.join('?' * n)
+
+class HeadingIndex:
+    """
+    A document's headings get consecutive ids (docs.first..docs.last, in outline order), so 'does this
+    document match' is one range probe of the (token, heading) key per query word.
+    """
+
+    def __init__(self, out_dir, path=None):
+        self.out_dir = out_dir
+        self.db = sqlite3.connect(path or os.path.join(out_dir, INDEX_NAME), timeout=30, isolation_level=None)
+        self.db.executescript(SCHEMA)
+        self._token_ids = {}
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- updating ----------
+
+    def _ids(self, words, create=False):
+        """Token ids for words (dict); create=True adds the missing ones."""
+        missing = [w for w in words if w not in self._token_ids]
+        if missing and create:
+            self.db.executemany('INSERT OR IGNORE INTO tokens (text) VALUES (?)', ((w,) for w in missing))
+        for i in range(0, len(missing), 500):
+            chunk = missing[i:i + 500]
+            self._token_ids.update(
+                (text, tid) for tid, text in self.db.execute(f'SELECT id, text FROM tokens WHERE text IN ({_marks(len(chunk))})', chunk))
+        return {w: self._token_ids[w] for w in words if w in self._token_ids}
+
+    def _drop(self, doc_id, first, last):
+        words = set()
+        for (text,) in self.db.execute('SELECT text FROM headings WHERE id BETWEEN ? AND ?', (first, last)):
+            words |= tokens(text)
+        self.db.executemany('DELETE FROM terms WHERE token = ? AND heading BETWEEN ? AND ?',
+                            ((tid, first, last) for tid in self._ids(sorted(words)).values()))
+        self.db.execute('DELETE FROM headings WHERE id BETWEEN ? AND ?', (first, last))
+        self.db.execute('DELETE FROM docs WHERE id = ?', (doc_id,))
+
+    def add(self, json_path, st=None):
+        """(Re)index one result file; returns the number of headings, or None if it isn't an outline."""
+        name = os.path.basename(json_path)
+        try:
+            st = st or os.stat(json_path)
+            with open(json_path, encoding='utf-8') as fp:
+                result = json.load(fp)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(result, dict) or not ('outline' in result or 'headings' in result):
+            return None
+        heads = list(flat_headings(result))
+        words = [tokens(text) for _, _, text in heads]
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.db.execute('SELECT id, first, last FROM docs WHERE file = ?', (name,)).fetchone()
+            if row:
+                self._drop(*row)
+            first = self.db.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM headings').fetchone()[0]
+            last = first + len(heads) - 1
+            doc_id = self.db.execute(
+                'INSERT INTO docs (file, size, mtime_ns, title, complete, first, last) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (name, st.st_size, st.st_mtime_ns, result.get('title', ''), int(result.get('complete', True)),
+                 first, last)).lastrowid
+            self.db.executemany('INSERT INTO headings (id, doc, level, page, text) VALUES (?, ?, ?, ?, ?)',
+                                ((first + i, doc_id, level, page, text) for i, (level, page, text) in enumerate(heads)))
+            ids = self._ids(sorted(set().union(*words)), create=True)
+            self.db.executemany('INSERT INTO terms VALUES (?, ?)',
+                                ((ids[w], first + i) for i, ws in enumerate(words) for w in ws))
+            self.db.execute('COMMIT')
+        except BaseException:
+            self.db.execute('ROLLBACK')
+            self._token_ids.clear()  # may hold ids of rolled-back tokens
+            raise
+        return len(heads)
+
+    def remove(self, name):
+        self.db.execute('BEGIN IMMEDIATE')
+        row = self.db.execute('SELECT id, first, last FROM docs WHERE file = ?', (os.path.basename(name),)).fetchone()
+        if row:
+            self._drop(*row)
+        self.db.execute('COMMIT')
+
+    def update(self):
+        """Index new and changed result files, drop vanished ones; returns (indexed, removed)."""
+        known = {name: (size, mtime) for name, size, mtime in self.db.execute('SELECT file, size, mtime_ns FROM docs')}
+        indexed = 0
+        present = set()
+        for entry in os.scandir(self.out_dir):
+            if not entry.is_file() or not is_outline_file(entry.name):
+                continue
+            present.add(entry.name)
+            st = entry.stat()
+            if known.get(entry.name) != (st.st_size, st.st_mtime_ns):
+                indexed += self.add(entry.path, st) is not None
+        gone = [name for name in known if name not in present]
+        for name in gone:
+            self.remove(name)
+        return indexed, len(gone)
+
+    # ---------- queries ----------
+
+    def _word_ids(self, query, prefix):
+        # token ids per query word; the last word with prefix=True matches every token it starts
+        words = sorted({t.lower() for t in TOKEN.findall(query)}, key=query.lower().find)
+        out = []
+        for i, word in enumerate(words):
+            if prefix and i == len(words) - 1:
+                ids = [tid for (tid,) in self.db.execute('SELECT id FROM tokens WHERE text >= ? AND text < ?',
+                                                        (word, word + '\U0010ffff'))]
+            else:
+                ids = list(self._ids([word]).values())
+            out.append(ids)
+        return out
+
+    def _where(self, word_ids, levels, pages, files, heading='h.id'):
+        where, args = [], []
+        for ids in word_ids:
+            where.append(f'EXISTS (SELECT 1 FROM terms WHERE token IN ({_marks(len(ids))}) AND heading = {heading})')
+            args += ids
+        if levels:
+            where.append(f'h.level IN ({_marks(len(levels))})')
+            args += list(levels)
+        if pages:
+            where.append('h.page BETWEEN ? AND ?')
+            args += list(pages)
+        if files:
+            where.append(f'd.file IN ({_marks(len(files))})')
+            args += list(files)
+        return where, args
+
+    def search(self, query='', prefix=False, levels=None, pages=None, files=None, limit=100):
+        """
+        Headings whose text has every word of query (the last one as a prefix if prefix=True),
+        optionally restricted to levels ('H1', ...), a (first, last) page range and file names, in file
+        then outline order.  Returns dicts with file, title, level, page, text and pos (index in the
+        file's outline).
+        """
+        word_ids = self._word_ids(query, prefix)
+        if any(not ids for ids in word_ids):
+            return []
+        cols = 'd.file, d.title, h.level, h.page, h.text, h.id - d.first'
+        if word_ids:
+            # stream the postings of the most specific word, in heading order; check the rest per heading
+            word_ids.sort(key=len)
+            drive, rest = word_ids[0], word_ids[1:]
+            where, args = self._where(rest, levels, pages, files)
+            distinct = 'DISTINCT ' if len(drive) > 1 else ''  # a heading can hold several tokens of a prefix
+            sql = (f'SELECT {distinct}{cols} FROM terms t JOIN headings h ON h.id = t.heading JOIN docs d ON d.id = h.doc '
+                   f'WHERE t.token IN ({_marks(len(drive))})' + ''.join(' AND ' + w for w in where) + ' ORDER BY t.heading')
+            args = drive + args
+        else:
+            where, args = self._where([], levels, pages, files)
+            sql = (f'SELECT {cols} FROM headings h JOIN docs d ON d.id = h.doc'
+                   + (' WHERE ' + ' AND '.join(where) if where else '') + ' ORDER BY h.id')
+        if limit:
+            sql += f' LIMIT {int(limit)}'
+        keys = ('file', 'title', 'level', 'page', 'text', 'pos')
+        return [dict(zip(keys, row)) for row in self.db.execute(sql, args)]
+
+    def files(self, query='', prefix=False, levels=None, pages=None):
+        """Names of the files with at least one matching heading (see search); one probe per file and word."""
+        word_ids = self._word_ids(query, prefix)
+        if any(not ids for ids in word_ids):
+            return []
+        word_ids.sort(key=len)
+        if word_ids:
+            drive = word_ids[0]
+            where, args = self._where(word_ids[1:], levels, pages, None, 't.heading')
+            inner = (f'SELECT 1 FROM terms t JOIN headings h ON h.id = t.heading WHERE t.token IN ({_marks(len(drive))}) '
+                     'AND t.heading BETWEEN d.first AND d.last' + ''.join(' AND ' + w for w in where))
+            args = drive + args
+        else:
+            where, args = self._where([], levels, pages, None)
+            inner = 'SELECT 1 FROM headings h WHERE h.id BETWEEN d.first AND d.last' + ''.join(' AND ' + w for w in where)
+        sql = f'SELECT d.file FROM docs d WHERE EXISTS ({inner}) ORDER BY d.file'
+        return [name for (name,) in self.db.execute(sql, args)]
+
+    def stats(self):
+        count = lambda table: self.db.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        return {'documents': count('docs'), 'headings': count('headings'), 'tokens': count('tokens')}
+
+def update_index(out_dir):
+    with HeadingIndex(out_dir) as index:
+        return index.update()
+
+def _page_range(spec):
+    lo, _, hi = spec.partition('-')
+    return int(lo or 1), int(hi) if hi else 10**9
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Index and search the headings of an output directory.')
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    up = sub.add_parser('update', help='index new and changed result files')
+    up.add_argument('output', nargs='?', default='output')
+    q = sub.add_parser('search', help='find headings')
+    q.add_argument('output')
+    q.add_argument('query', nargs='?', default='')
+    q.add_argument('--prefix', action='store_true', help='match the last word as a prefix')
+    q.add_argument('--level', nargs='+', default=None, help='e.g. H1 H2')
+    q.add_argument('--pages', type=_page_range, default=None, help="page range, e.g. '1-20' or '5-'")
+    q.add_argument('--files-only', action='store_true', help='list matching files only')
+    q.add_argument('--limit', type=int, default=100)
+    args = ap.parse_args()
+    with HeadingIndex(args.output) as index:
+        if args.cmd == 'update':
+            indexed, removed = index.update()
+            print(f'[✓] {indexed} files indexed, {removed} removed; {json.dumps(index.stats())}')
+            sys.exit(0)
+        if args.files_only:
+            print('\n'.join(index.files(args.query, args.prefix, args.level, args.pages)))
+        else:
+            for h in index.search(args.query, args.prefix, args.level, args.pages, limit=args.limit):
+                print(f"{h['file']}  p.{h['page']}  {h['level']}  {h['text']}")
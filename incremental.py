@@ -0,0 +1,158 @@
+"""
+Incremental re-extraction for gemini: only pages whose content changed are parsed again.
+
+    gemini.extract_outline('contract.pdf', page_cache='output/contract.pages.json')
+    python batch_runner.py --incremental        # <name>.pages.json next to each <name>.json
+
+The page cache stores, per page fingerprint (a hash of the page's content
+streams, form XObjects, fonts and geometry), everything gemini's analysis
+needs that doesn't depend on the rest of the document: the font size range
+of the page and its candidate lines and header/footer signatures (see
+gemini.page_record).  The model's verdict on each undecided line is kept as
+well.  On the next run a page with a known fingerprint is not parsed at all;
+the document-level steps (max_fs/min_fs, duplicate lines, levels,
+header/footer repeats, the model for lines it hasn't seen) are recomputed
+from the cached records, which is cheap, so the result is the same as a full
+extraction.  Pages are matched by fingerprint, not position, so inserting or
+moving pages doesn't invalidate the others.  The whole cache is dropped when
+the extraction parameters, the model or FORMAT change.
+
+This is also the engine behind bounded runs (pages=/deadline=, see
+partial), with or without a cache file: a bounded run adds the pages it
+read to the cache and keeps the entries it didn't get to.
+"""
+import hashlib, json, os, tempfile
+
+import gemini
+from heading_classifier import BATCH_SIZE, model_for
+from native_toc import toc_outline
+from partial import Deadline, iter_pages, mark_coverage, select_pages
+from profiling import NULL_METRICS
+from result_cache import model_digest
+
+FORMAT = 2
+SUFFIX = '.pages.json'
+
+def cache_path(json_output):
+    """Page cache kept next to an output JSON: output/x.json -> output/x.pages.json."""
+    return os.path.splitext(json_output)[0] + SUFFIX
+
+# ---------- fingerprints ----------
+
+def page_fingerprint(page, memo=None):
+    """sha256 over what the page's text is drawn from; memo caches font/XObject hashes shared by pages."""
+    memo = {} if memo is None else memo
+    doc = page.parent
+    h = hashlib.sha256(repr((tuple(page.rect), page.rotation)).encode())
+    h.update(page.read_contents())
+    for xref, *info in page.get_fonts(full=True):
+        h.update(repr(info).encode())
+        h.update(_xref_hash(doc, xref, memo, 'ToUnicode'))
+    for xref, *info in page.get_xobjects():
+        h.update(repr(info).encode())
+        h.update(_xref_hash(doc, xref, memo))
+    return h.hexdigest()
+
+def _xref_hash(doc, xref, memo, stream_key=None):
+    # an object's definition plus its stream (a font's ToUnicode map, a form XObject's content)
+    if xref not in memo:
+        h = hashlib.sha256(doc.xref_object(xref, compressed=True).encode())
+        stream = xref
+        if stream_key:
+            kind, ref = doc.xref_get_key(xref, stream_key)
+            stream = int(ref.split()[0]) if kind == 'xref' else 0
+        if stream and doc.xref_is_stream(stream):
+            h.update(doc.xref_stream(stream))
+        memo[xref] = h.digest()
+    return memo[xref]
+
+# ---------- cache file ----------
+
+def load_cache(path, params):
+    """Cached pages and labels for params, or empty ones if the file is missing, unreadable or stale."""
+    try:
+        with open(path, encoding='utf-8') as fp:
+            data = json.load(fp)
+        if data.get('format') == FORMAT and data.get('params') == params:
+            return data['pages'], data['labels']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return {}, {}
+
+def save_cache(path, params, pages, labels):
+    data = {'format': FORMAT, 'params': params, 'pages': pages, 'labels': labels}
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as fp:
+            json.dump(data, fp)
+        os.replace(tmp, path)
+    except OSError:
+        os.unlink(tmp)
+        raise
+
+# ---------- extraction ----------
+
+def extract_outline(pdf_path, cache_file, header_footer_thresh=0.1, table_span_thresh=10, batch_size=BATCH_SIZE,
+                    toc='verify', header_footer='band', metrics=NULL_METRICS, clip_bands=False, classifier='features',
+                    budget=None, pages=None, deadline=None):
+    """
+    gemini.extract_outline, reusing cache_file's records for unchanged pages and rewriting it afterwards
+    (cache_file=None: no cache).  pages / deadline (seconds) bound the run; see partial.
+    """
+    timer = Deadline(deadline)
+    bounded = pages is not None or deadline is not None
+    with metrics.stage('open'):
+        doc, title = gemini.open_pdf(pdf_path)
+    if doc is None:
+        return {'title': title, 'outline': []}
+    with metrics.stage('toc'):
+        native = toc_outline(doc, toc)
+    if native is not None:
+        metrics.count('toc_used')
+        if not bounded:
+            return {'title': title, 'outline': native}
+        # no page is read, but a pages= run still only reports the headings on the pages it asked for
+        wanted = select_pages(pages, doc.page_count)
+        keep = set(wanted)
+        result = {'title': title, 'outline': [h for h in native if h['page'] in keep]}
+        return mark_coverage(result, wanted, doc.page_count, timer)
+
+    keep_band = header_footer == 'repeat'
+    clip = clip_bands and not keep_band
+    model_path = model_for(classifier, gemini.MODEL_PATH)
+    params = {'header_footer_thresh': header_footer_thresh, 'table_span_thresh': table_span_thresh,
+              'header_footer': header_footer, 'clip_bands': clip, 'classifier': classifier,
+              'model': model_digest(model_path)}
+    cached, labels = load_cache(cache_file, params) if cache_file else ({}, {})
+
+    records, done, memo, analysed = [], [], {}, 0
+    for pno, page in iter_pages(doc, pages, budget=budget):
+        # fingerprinting cached pages takes time too: a run always parses at least one page that
+        # isn't cached yet, so repeated bounded runs finish the document
+        if timer.expired() and (analysed or not cache_file):
+            break
+        done.append(pno)
+        fp = None
+        if cache_file:
+            with metrics.stage('fingerprint'):
+                fp = page_fingerprint(page, memo)
+        rec = cached.get(fp)
+        if rec is None:
+            with metrics.stage('get_text'):
+                rec = gemini.page_record(page, header_footer_thresh, table_span_thresh, keep_band, clip)
+            metrics.count('pages_analysed')
+            analysed += 1
+        else:
+            metrics.count('pages_reused')
+        records.append((fp, rec))
+
+    result, used = gemini.outline_from_records([rec for _, rec in records], labels, model_path, classifier, batch_size,
+                                               header_footer, metrics, done)
+    complete = len(done) == doc.page_count
+    if cache_file:
+        # a partial run keeps what it didn't get to: those pages may still be unchanged
+        pages_out = {fp: rec for fp, rec in records} if complete else {**cached, **dict(records)}
+        with metrics.stage('write_cache'):
+            save_cache(cache_file, params, pages_out, {k: labels[k] for k in used} if complete else labels)
+    result = {'title': title, 'outline': result}
+    return mark_coverage(result, done, doc.page_count, timer) if bounded else result
@@ -0,0 +1,18 @@
+import json
+
+# ---------- JSONL output for page-by-page results ----------
+
+def page_records(pages, key='outline'):
+    """Turn (page, headings) pairs into one JSON-ready record per page."""
+    for page, headings in pages:
+        yield {'page': page, key: headings}
+
+def write_jsonl(records, out_path):
+    """Write one JSON object per line, flushing after each so readers can follow along. Returns the line count."""
+    n = 0
+    with open(out_path, 'w', encoding='utf-8') as fp:
+        for rec in records:
+            fp.write(json.dumps(rec, ensure_ascii=False) + '\n')
+            fp.flush()
+            n += 1
+    return n
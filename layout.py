@@ -0,0 +1,137 @@
+"""
+Per-page layout analysis from line bounding boxes.
+
+    python layout.py input/sample.pdf 3        # layout of page 3
+
+line_layout() takes the (x0, y0, x1, y1) boxes of a page's lines, as they
+come in get_text('dict'), and returns one array per feature, aligned with
+the input:
+
+    column      text column, from the left edges of narrow lines
+    gap_above   whitespace to the row above in the same column (NaN: none)
+    gap_below   whitespace to the row below in the same column (NaN: none)
+    indent      x0 minus the column's usual left edge
+    centered    line centre within 20% of the page width from the page centre
+    blank_above / blank_below
+                gap larger than the page's usual line spacing by half a line
+
+Lines whose boxes overlap vertically (table cells, a line split into
+pieces) form one row, so they share their gaps.  Everything is sorts and
+prefix scans, O(n log n) in the number of lines.  NumPy is imported on the
+first call, not with the module (gemini imports this one).
+"""
+import sys
+from itertools import chain
+
+NARROW = 0.55       # lines narrower than this share of the text width can sit in a column
+MIN_COLUMN = 0.1    # share of the narrow lines a column needs (at least 3), and that may cross a gutter
+GUTTER = 0.02       # share of the text width: least jump between left edges, and how far a line may reach past one
+BLANK_LINES = 0.5   # extra whitespace, in median line heights, that counts as a blank line
+ROW_OVERLAP = 0.2   # vertical overlap, in median line heights, that still separates two rows
+
+def _middle(a):
+    # median without np.median's overhead (these arrays are a page's worth of lines)
+    import numpy as np
+    return float(np.partition(a, len(a) // 2)[len(a) // 2])
+
+def columns(x0, x1):
+    """
+    Column index of each line.  Column starts are jumps in the sorted left edges of the narrow lines
+    that hardly any narrow line crosses (a centred footer may) and that enough lines start at.
+    """
+    import numpy as np
+    left, right = x0.min(), x1.max()
+    narrow = x1 - x0 < NARROW * (right - left)
+    n_narrow = int(narrow.sum())
+    if n_narrow < 6:
+        return None
+    xs, ends = np.sort(x0[narrow]), np.sort(x1[narrow])
+    tol = GUTTER * (right - left)
+    cands = xs[1:][np.diff(xs) > tol]
+    if not len(cands):
+        return None
+    crossing = np.searchsorted(xs, cands, side='left') - np.searchsorted(ends, cands + tol, side='right')
+    bounds = np.concatenate((xs[:1], cands[crossing <= MIN_COLUMN * n_narrow]))
+    support = np.diff(np.append(np.searchsorted(xs, bounds, side='left'), n_narrow))
+    bounds = bounds[support >= max(3, MIN_COLUMN * n_narrow)]
+    if len(bounds) < 2:
+        return None
+    # a line belongs to the rightmost column starting at or left of it; wide lines go by their left edge
+    return np.searchsorted(bounds[1:], x0, side='right')
+
+def line_layout(boxes, page_width):
+    """Layout features (dict of arrays, see the module docstring) for a page's line boxes."""
+    import numpy as np
+    b = np.fromiter(chain.from_iterable(boxes), np.float64, 4 * len(boxes)).reshape(-1, 4)
+    x0, y0, x1, y1 = b.T
+    n = len(b)
+    if not n:
+        empty = np.zeros(0)
+        return dict(column=np.zeros(0, dtype=np.intp), gap_above=empty, gap_below=empty, indent=empty,
+                    centered=empty.astype(bool), blank_above=empty.astype(bool), blank_below=empty.astype(bool))
+    col = columns(x0, x1)
+    height = _middle(y1 - y0)
+
+    # rows: sort by (column, y0); a line starts a new row when it begins below everything above it
+    if col is None:
+        col = np.zeros(n, dtype=np.intp)
+        order = np.argsort(y0, kind='stable')
+        cs, top, bottom = col, y0[order], y1[order]
+        reach = np.maximum.accumulate(bottom)
+        same_col = True
+    else:
+        order = np.lexsort((y0, col))
+        cs, top, bottom = col[order], y0[order], y1[order]
+        offset = cs * (np.abs(b).max() * 4 + 1)  # keeps the running max from leaking across columns
+        reach = np.maximum.accumulate(bottom + offset) - offset
+        same_col = cs[1:] == cs[:-1]
+    new_row = np.ones(n, dtype=bool)
+    new_row[1:] = ~same_col | (top[1:] > reach[:-1] - ROW_OVERLAP * height)
+    starts = np.flatnonzero(new_row)
+    row_bottom = np.maximum.reduceat(bottom, starts)
+
+    # gaps between consecutive rows of a column, padded with NaN at both ends
+    gaps = np.full(len(starts) + 1, np.nan)
+    gaps[1:-1] = top[starts[1:]] - row_bottom[:-1]
+    if col.any():
+        gaps[1:-1][cs[starts[1:]] != cs[starts[:-1]]] = np.nan
+    inner = gaps[1:-1][~np.isnan(gaps[1:-1])]
+    blank = max(_middle(inner) if len(inner) else 0.0, 0.0) + BLANK_LINES * height
+
+    row_of = np.empty(n, dtype=np.intp)
+    row_of[order] = np.cumsum(new_row) - 1
+    gap_above, gap_below = gaps[row_of], gaps[row_of + 1]
+
+    # usual left edge of a column: median x0 of its lines
+    if col.any():
+        counts = np.bincount(col)
+        first = np.cumsum(counts) - counts
+        margin = x0[np.lexsort((x0, col))][first + counts // 2][col]
+    else:
+        margin = _middle(x0)
+
+    with np.errstate(invalid='ignore'):
+        return {
+            'column': col,
+            'gap_above': gap_above,
+            'gap_below': gap_below,
+            'indent': x0 - margin,
+            'centered': np.abs((x0 + x1) / 2 - page_width / 2) < page_width * 0.2,
+            'blank_above': gap_above > blank,
+            'blank_below': gap_below > blank,
+        }
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print('Usage: python layout.py <input.pdf> <page number>')
+        sys.exit(1)
+    import fitz
+    from page_text import text_blocks
+    page = fitz.open(sys.argv[1])[int(sys.argv[2]) - 1]
+    lines = [line for blk in text_blocks(page) for line in blk.get('lines', ())]
+    lay = line_layout([line['bbox'] for line in lines], page.rect.width)
+    for i, line in enumerate(lines):
+        text = ''.join(s['text'] for s in line.get('spans', ())).strip()
+        print(f"col {lay['column'][i]}  above {lay['gap_above'][i]:6.1f}{'*' if lay['blank_above'][i] else ' '}  "
+              f"below {lay['gap_below'][i]:6.1f}{'*' if lay['blank_below'][i] else ' '}  "
+              f"indent {lay['indent'][i]:6.1f}  {'C' if lay['centered'][i] else ' '}  {text[:60]}")
@@ -1,9 +1,12 @@
+import timings  # first, so --timings counts the imports below
 import fitz  # PyMuPDF
 import json
 import os
 import sys
-from collections import defaultdict
 from pathlib import Path
+from jsonl_stream import page_records, write_jsonl
+from page_text import text_blocks
+from span_store import SpanStore, page_y_order, size_ranks
 
 def is_heading_candidate(span):
     text = span.get("text", "").strip()
@@ -15,77 +18,52 @@ def is_heading_candidate(span):
         return True
     return False
 
-def extract_heading_spans(page, min_font_size=10):
-    heading_spans = []
-    blocks = page.get_text("dict")["blocks"]
-
-    for block in blocks:
+def collect_heading_spans(store, page, page_no):
+    """Append the page's text-level heading candidates to a SpanStore."""
+    for block in text_blocks(page):
         for line in block.get("lines", []):
             for span in line.get("spans", []):
-                text = span.get("text", "").strip()
-                if not is_heading_candidate(span):
-                    continue
-
-                font_size = span.get("size", 0)
-                font = span.get("font", "")
-                flags = span.get("flags", 0)
-                bbox = span.get("bbox", [])
-                color = span.get("color", 0)
-
-                is_bold = bool(flags & 2)
-                is_caps = text.isupper()
-                left_aligned = abs(bbox[0]) < 50  # close to left edge
-
-                if font_size < min_font_size:
-                    continue
-
-                heading_spans.append({
-                    "text": text,
-                    "font_size": font_size,
-                    "font": font,
-                    "flags": flags,
-                    "bbox": bbox,
-                    "color": color,
-                    "is_bold": is_bold,
-                    "is_caps": is_caps,
-                    "left_aligned": left_aligned,
-                    "y": bbox[1],
-                })
-    return heading_spans
-
-def assign_levels(spans):
-    unique_sizes = sorted({s["font_size"] for s in spans}, reverse=True)
-    size_to_level = {sz: i + 1 for i, sz in enumerate(unique_sizes)}
-    for s in spans:
-        s["level"] = size_to_level[s["font_size"]]
-    return spans
-
-def group_by_page(doc):
-    headings_by_page = []
-    for i, page in enumerate(doc):
-        spans = extract_heading_spans(page)
-        spans = assign_levels(spans)
-        for s in spans:
-            s["page"] = i + 1
-        headings_by_page.extend(spans)
-    return headings_by_page
-
-def generate_json_structure(headings):
-    # Sort by page and y-position to maintain logical order
-    headings.sort(key=lambda x: (x["page"], x["y"]))
-
+                if is_heading_candidate(span):
+                    store.add(span, span.get("text", "").strip(), page_no)
+
+def headings_from_store(store, min_font_size=10):
+    """Size filter, per-page levels and (page, y) order on the columns; dicts only for the output."""
+    import numpy as np
+    cols = store.freeze()
+    keep = np.flatnonzero(cols["size"] >= min_font_size)
+    page, size = cols["page"][keep], cols["size"][keep]
+    levels = np.empty(len(keep), dtype=np.int64)
+    # spans are stored page by page, so each page is a contiguous run
+    for run in np.split(np.arange(len(keep)), np.flatnonzero(np.diff(page)) + 1):
+        levels[run] = size_ranks(size[run])
     output = []
-    for h in headings:
+    for j in page_y_order(page, cols["y"][keep]):
+        i = keep[j]
+        text = store.texts[cols["text"][i]]
         output.append({
-            "text": h["text"],
-            "level": h["level"],
-            "page": h["page"],
-            "font_size": h["font_size"],
-            "bold": h["is_bold"],
-            "caps": h["is_caps"],
+            "text": text,
+            "level": int(levels[j]),
+            "page": int(page[j]),
+            "font_size": float(size[j]),
+            "bold": bool(cols["flags"][i] & 2),
+            "caps": text.isupper(),
         })
     return output
 
+def extract_headings(doc):
+    """All headings of a document in output form, built on a SpanStore."""
+    store = SpanStore()
+    for i, page in enumerate(doc):
+        collect_heading_spans(store, page, i + 1)
+    return headings_from_store(store) if len(store) else []
+
+def iter_headings(doc):
+    """Yield (page number, headings) per page, in the same form and order as extract_headings."""
+    for i, page in enumerate(doc):
+        store = SpanStore()
+        collect_heading_spans(store, page, i + 1)
+        yield i + 1, headings_from_store(store) if len(store) else []
+
 def save_to_json(data, output_path):
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
@@ -96,19 +74,28 @@ def extract_headings_from_pdf(pdf_path, json_output="headings_output.json"):
         return
 
     doc = fitz.open(pdf_path)
-    headings = group_by_page(doc)
-    structured = generate_json_structure(headings)
-    save_to_json(structured, json_output)
+    if json_output.endswith(".jsonl"):
+        # stream one line per page instead of holding the whole document
+        write_jsonl(page_records(iter_headings(doc), key="headings"), json_output)
+    else:
+        save_to_json(extract_headings(doc), json_output)
     print(f"[✓] Headings extracted and saved to: {json_output}")
 
 # ---------- Run this part ----------
 if __name__ == "__main__":
     # Example usage:
-    # python extract_headings.py input.pdf
-    if len(sys.argv) != 2:
-        print("Usage: python extract_headings.py <input_pdf>")
+    # python extract_headings.py input.pdf [--jsonl] [--timings]
+    show_timings = "--timings" in sys.argv
+    if show_timings:
+        sys.argv.remove("--timings")
+    if len(sys.argv) not in (2, 3) or (len(sys.argv) == 3 and sys.argv[2] != "--jsonl"):
+        print("Usage: python extract_headings.py <input_pdf> [--jsonl] [--timings]")
         sys.exit(1)
     pdf_path = sys.argv[1]
-    output_json = Path(pdf_path).stem + "_headings.json"
-    extract_headings_from_pdf(pdf_path, output_json)
+    output_json = Path(pdf_path).stem + ("_headings.jsonl" if len(sys.argv) == 3 else "_headings.json")
+    timings.mark_ready()
+    with timings.stage("extract"):
+        extract_headings_from_pdf(pdf_path, output_json)
+    if show_timings:
+        timings.print_report()
 
@@ -1,9 +1,19 @@
+import timings  # first, so --timings counts the imports below
+import argparse
 import fitz  # PyMuPDF
 import json
+import math
 import os
-import sys
 from collections import Counter
+from font_profile import FontProfile
 from pathlib import Path
+from profiling import NULL_METRICS, Metrics
+from header_footer import HeaderFooterStream, y_bucket
+from jsonl_stream import page_records, write_jsonl
+from memory_budget import MemoryBudget, peak_rss_mb
+from page_text import text_blocks
+from partial import Deadline, iter_pages, mark_coverage
+from span_store import SpanStore, page_y_order, size_ranks
 
 
 
@@ -30,32 +40,11 @@ def is_heading_candidate(span, min_font_size, min_text_length=2, max_words=8, mi
         return False
     return True
 
-def detect_repeated_headers(headings_by_page, top_margin=50, bottom_margin=50, tolerance=5):
-    """
-    Identify text spans that appear on almost every page in similar positions (likely headers/footers) and filter them.
-    """
-    # Collect candidate texts by (text, y-position bucket)
-    counter = Counter()
-    total_pages = max(h['page'] for h in headings_by_page) if headings_by_page else 0
-
-    for h in headings_by_page:
-        y = h['y']
-        page = h['page']
-        bucket = round(y / tolerance) * tolerance
-        if y < top_margin or h['page_height'] - y < bottom_margin:
-            counter[(h['text'], bucket)] += 1
-
-    # Headers/footers appear on >80% of pages
-    repeated = {text for (text, _), count in counter.items() if count / total_pages > 0.8}
-    return repeated
-
-
 def extract_heading_spans(page, min_font_size):
     spans = []
-    page_dict = page.get_text("dict")
     page_height = page.rect.height
 
-    for block in page_dict.get("blocks", []):
+    for block in text_blocks(page):
         for line in block.get("lines", []):
             for span in line.get("spans", []):
                 if is_heading_candidate(span, min_font_size):
@@ -72,13 +61,87 @@ def extract_heading_spans(page, min_font_size):
     return spans
 
 
-def assign_levels(spans):
-    # Unique font sizes sorted descending => larger size = higher-level heading
-    unique_sizes = sorted({s['font_size'] for s in spans}, reverse=True)
-    size_to_level = {size: idx + 1 for idx, size in enumerate(unique_sizes)}
-    for s in spans:
-        s['level'] = size_to_level[s['font_size']]
-    return spans
+def iter_page_headings(doc, min_font_size):
+    """
+    Yield (page number, candidate spans) one page at a time.
+    Header/footer filtering and level assignment need the whole document and are applied by the caller.
+    """
+    for page_num, page in enumerate(doc, start=1):
+        spans = extract_heading_spans(page, min_font_size)
+        for s in spans:
+            s['page'] = page_num
+        yield page_num, spans
+
+
+def collect_page_spans(page, page_num, profile, store):
+    """collect_spans for one page: adds its spans to profile and its text-level candidates to store."""
+    page_height = page.rect.height
+    for block in text_blocks(page):
+        for line in block.get("lines", []):
+            for span in line.get("spans", []):
+                profile.add_span(span)
+                if is_heading_candidate(span, -math.inf):
+                    store.add(span, span["text"].strip(), page_num, page_height)
+
+
+def collect_spans(doc, store, budget=None, pages=None, deadline=None, done=None):
+    """
+    Single pass over the document: returns the document's FontProfile and appends the spans that pass
+    the text checks of is_heading_candidate to store (the size check is applied later, vectorized).
+    With a memory_budget.MemoryBudget the pages are read chunk by chunk.  pages / deadline (a
+    partial.Deadline) bound the pass, and the page numbers read go to done (see partial.iter_pages).
+    """
+    profile = FontProfile()
+    for page_num, page in iter_pages(doc, pages, deadline, done, budget):
+        collect_page_spans(page, page_num, profile, store)
+    return profile
+
+
+def repeated_header_ids(cols, keep, top_margin=50, bottom_margin=50, tolerance=5, total_pages=None):
+    """
+    Ids of the texts in the top/bottom margins that recur at about the same height on more than 80% of
+    the pages (running headers/footers), from SpanStore columns.
+    """
+    if not len(keep):
+        return set()
+    y, page_height = cols['y'][keep], cols['page_height'][keep]
+    total_pages = total_pages or int(cols['page'][keep].max())
+    counter = Counter()
+    for i in keep[(y < top_margin) | (page_height - y < bottom_margin)]:
+        counter[(int(cols['text'][i]), round(float(cols['y'][i]) / tolerance) * tolerance)] += 1
+    return {text for (text, _), count in counter.items() if count / total_pages > 0.8}
+
+
+def iter_headings(doc, min_font_size=None, top_margin=50, bottom_margin=50, lag=8, window=50):
+    """
+    Streaming variant of extract_headings_from_pdf: yields (page number, flat headings) with
+    running headers/footers removed on the fly by HeaderFooterStream.
+    A first pass collects only font-size statistics; levels come from the distinct candidate sizes,
+    so they can differ from the batch result when a size occurs only in header/footer text.
+    """
+    profile, candidate_sizes = FontProfile(), Counter()
+    for page in doc:
+        for block in text_blocks(page):
+            for line in block.get("lines", []):
+                for span in line.get("spans", []):
+                    profile.add_span(span)
+                    if is_heading_candidate(span, -math.inf):
+                        candidate_sizes[span.get("size", 0)] += 1
+    if min_font_size is None:
+        threshold = profile.percentile(20)
+        min_font_size = 10.0 if threshold is None else float(threshold)
+    tiers = sorted((s for s in candidate_sizes if s >= min_font_size), reverse=True)
+    size_to_level = {size: idx + 1 for idx, size in enumerate(tiers)}
+
+    detector = HeaderFooterStream(lag, window)
+    for page_num, spans in iter_page_headings(doc, min_font_size):
+        spans.sort(key=lambda s: s['y'])
+        margins = {(s['text'], y_bucket(s['y'])) for s in spans
+                   if s['y'] < top_margin or s['page_height'] - s['y'] < bottom_margin}
+        items = [(s['text'], {'text': s['text'], 'level': size_to_level[s['font_size']], 'page': page_num})
+                 for s in spans]
+        yield from detector.push(page_num, margins, items)
+    yield from detector.flush()
 
 
 def build_hierarchy(flat_headings):
@@ -101,47 +164,79 @@ def build_hierarchy(flat_headings):
     return root
 
 
-def extract_headings_from_pdf(pdf_path, min_font_size=None, json_output=None):
+def extract_headings_from_pdf(pdf_path, min_font_size=None, json_output=None, metrics=NULL_METRICS, max_rss_mb=None,
+                              page_workers=None, pages=None, deadline=None):
+    """
+    max_rss_mb keeps memory flat on very long documents: pages are parsed in chunks and the document is
+    closed before the output is built (see memory_budget).  Candidates already live in SpanStore's
+    typed columns, about 100 bytes each, so they stay in memory.
+    page_workers > 1 collects the spans of page ranges in that many processes (see sharded); the
+    result is the same.
+    pages ('1-10,~10' or page numbers) / deadline (seconds) bound the pass and add 'complete' and
+    'coverage' to the output (see partial); page_workers is then ignored.
+    """
     if not os.path.isfile(pdf_path):
         raise FileNotFoundError(f"PDF not found: {pdf_path}")
 
-    doc = fitz.open(pdf_path)
+    timer = Deadline(deadline)
+    bounded = pages is not None or deadline is not None
+    with metrics.stage('open'):
+        doc = fitz.open(pdf_path)
+    n_pages = doc.page_count
+
+    # One pass: every span size (for the auto threshold) plus the text-level candidates
+    t = metrics.clock()
+    budget = MemoryBudget(max_rss_mb, pdf_path) if max_rss_mb else None
+    done = []
+    if bounded:
+        store = SpanStore()
+        profile = collect_spans(doc, store, budget, pages, timer, done)
+    elif page_workers and page_workers > 1:
+        from sharded import collect_spans_sharded
+        store, profile = collect_spans_sharded(pdf_path, doc.page_count, page_workers)
+    else:
+        store = SpanStore()
+        profile = collect_spans(doc, store, budget)
+    metrics.lap('get_text', t)
+    metrics.count('pages', len(done) if bounded else n_pages)
+    if budget:
+        doc.close()
+        budget.release()
 
     # Auto-detect a good min_font_size if not provided
     if min_font_size is None:
-        # Collect all font sizes
-        all_sizes = []
-        for page in doc:
-            for block in page.get_text("dict")["blocks"]:
-                for line in block.get("lines", []):
-                    for span in line.get("spans", []):
-                        size = span.get("size", 0)
-                        if size:
-                            all_sizes.append(size)
-        # Use the 20th percentile as threshold
-        if all_sizes:
-            import numpy as np
-            min_font_size = float(np.percentile(all_sizes, 20))
-        else:
-            min_font_size = 10.0
+        # Use the 20th percentile of the non-zero span sizes as threshold
+        threshold = profile.percentile(20)
+        min_font_size = 10.0 if threshold is None else float(threshold)
 
-    headings = []
-    for page_num, page in enumerate(doc, start=1):
-        spans = extract_heading_spans(page, min_font_size)
-        for s in spans:
-            s['page'] = page_num
-            headings.append(s)
+    import numpy as np
+    cols = store.freeze()
+    keep = np.flatnonzero(cols['size'] >= min_font_size)
+    metrics.count('candidates', len(keep))
 
     # Filter out repeated headers/footers
-    repeated = detect_repeated_headers(headings)
-    headings = [h for h in headings if h['text'] not in repeated]
+    t = metrics.clock()
+    repeated = repeated_header_ids(cols, keep, total_pages=len(done) if bounded and len(done) < n_pages else None)
+    if repeated:
+        keep = keep[~np.isin(cols['text'][keep], list(repeated))]
+    metrics.lap('header_footer', t)
+    metrics.count('header_footer_texts', len(repeated))
 
     # Sort and assign levels
-    headings.sort(key=lambda x: (x['page'], x['y']))
-    headings = assign_levels(headings)
+    t = metrics.clock()
+    keep = keep[page_y_order(cols['page'][keep], cols['y'][keep])]
+    levels = size_ranks(cols['size'][keep]) if len(keep) else []
+    headings = [{'text': store.texts[cols['text'][i]], 'level': int(lvl), 'page': int(cols['page'][i])}
+                for i, lvl in zip(keep, levels)]
 
     # Build hierarchy tree
     nested = build_hierarchy(headings)
+    metrics.lap('levels', t)
+    metrics.count('headings', len(headings))
+    if budget:
+        budget.over()  # one last sample, with the output built
+        metrics.count('peak_rss_mb', budget.peak_mb())
+        metrics.count('chunks', budget.chunks)
 
     # Prepare output
     output = {
@@ -149,26 +244,75 @@ def extract_headings_from_pdf(pdf_path, min_font_size=None, json_output=None):
         'min_font_size': min_font_size,
         'headings': nested
     }
+    if bounded:
+        mark_coverage(output, done, n_pages, timer)
 
     # Save to JSON
     if json_output:
-        with open(json_output, 'w', encoding='utf-8') as fp:
+        with metrics.stage('write_json'), open(json_output, 'w', encoding='utf-8') as fp:
             json.dump(output, fp, indent=2, ensure_ascii=False)
 
     return output
 
 
 if __name__ == '__main__':
-    if len(sys.argv) < 2 or len(sys.argv) > 4:
-        print("Usage: python extract_headings.py <input.pdf> [min_font_size] [output.json]")
-        sys.exit(1)
+    ap = argparse.ArgumentParser(description='Extract a nested heading tree from a PDF by font size.')
+    ap.add_argument('pdf')
+    ap.add_argument('min_font_size', nargs='?', type=float, default=None, help='default: 20th percentile of span sizes')
+    ap.add_argument('output', nargs='?', default=None, help='default: <pdf stem>_headings.json; .jsonl streams per page')
+    ap.add_argument('--timings', action='store_true', help='print start-up/stage timings to stderr')
+    ap.add_argument('--profile', action='store_true', help='write per-stage metrics to <output>.metrics.json')
+    ap.add_argument('--max-rss', type=float, default=None, metavar='MB', help='memory ceiling (see memory_budget.py)')
+    ap.add_argument('--page-workers', type=int, default=None, metavar='N', help='parse page ranges in N processes')
+    ap.add_argument('--pages', default=None, help="only these pages, e.g. '1-10,~10' (see partial.py)")
+    ap.add_argument('--deadline', type=float, default=None, metavar='SECS', help='stop reading pages after SECS')
+    args = ap.parse_args()
+    show_timings, profile, max_rss = args.timings, args.profile, args.max_rss
+    page_workers, pages, deadline = args.page_workers, args.pages, args.deadline
+    pdf_file, min_size = args.pdf, args.min_font_size
+    out_file = args.output or Path(pdf_file).stem + '_headings.json'
 
-    pdf_file = sys.argv[1]
-    min_size = float(sys.argv[2]) if len(sys.argv) >= 3 else None
-    out_file = sys.argv[3] if len(sys.argv) == 4 else Path(pdf_file).stem + '_headings.json'
+    if pages is not None:
+        from partial import parse_pages
+        try:
+            parse_pages(pages, 1)
+        except ValueError as e:
+            ap.error(f'--pages {pages!r}: not a page spec ({e})')
+    streaming = out_file.endswith('.jsonl')
+    if streaming:
+        unsupported = [flag for flag, value in (('--profile', profile or None), ('--max-rss', max_rss),
+                                                ('--page-workers', page_workers), ('--pages', pages),
+                                                ('--deadline', deadline)) if value is not None]
+        if unsupported:
+            ap.error(f"{', '.join(unsupported)}: not supported with .jsonl output")
 
+    timings.mark_ready()
+    metrics = Metrics() if profile else NULL_METRICS
     try:
-        result = extract_headings_from_pdf(pdf_file, min_size, out_file)
-        print(f"[✓] Extracted {len(result['headings'])} top-level headings to {out_file}")
+        with timings.stage('extract'):
+            if streaming:
+                # flat headings, one line per page, written as pages complete
+                if not os.path.isfile(pdf_file):
+                    raise FileNotFoundError(f"PDF not found: {pdf_file}")
+                with fitz.open(pdf_file) as doc:
+                    n = write_jsonl(page_records(iter_headings(doc, min_size), key='headings'), out_file)
+            else:
+                result = extract_headings_from_pdf(pdf_file, min_size, out_file, metrics, max_rss, page_workers, pages,
+                                                   deadline)
+        if streaming:
+            print(f"[✓] Streamed {n} pages of headings to {out_file}")
+        else:
+            print(f"[✓] Extracted {len(result['headings'])} top-level headings to {out_file}")
+            if not result.get('complete', True):
+                cov = result['coverage']
+                print(f"[!] Partial: {cov['pages']} of {cov['of']} pages (stopped by {cov['stopped']})")
+        if max_rss:
+            print(f"[✓] Peak RSS {peak_rss_mb():.0f} MB (ceiling {max_rss:.0f} MB)")
+        if profile:
+            # sidecar, so the headings JSON keeps its schema
+            with open(out_file + '.metrics.json', 'w') as fp:
+                json.dump(metrics.as_dict(), fp, indent=2)
     except Exception as e:
         print(f"Error: {e}")
+    if show_timings:
+        timings.print_report()
@@ -1,30 +1,56 @@
-import fitz, os
+import fitz, json, os, sys
+from font_profile import FontProfile, load_sidecar, save_sidecar
+from page_text import text_blocks
 
 PDF = "input/NEP2020_Rural_Development.pdf"
 
-def debug_font_sizes(pdf_path):
+def debug_font_sizes(pdf_path, spans=True):
     doc = fitz.open(pdf_path)
 
     # try decrypt
     if doc.is_encrypted:
         doc.authenticate("14062025")  # replace if needed
 
-    print(f"\n=== DEBUG: Scanning '{os.path.basename(pdf_path)}' for font-sizes ===")
+    # a cached profile makes the summary-only mode free; otherwise it's built during the scan
+    profile = load_sidecar(pdf_path)
+    if profile is not None and not spans:
+        print_profile(pdf_path, profile)
+        return profile
+    fresh = profile is None
+    profile = profile or FontProfile()
+
+    if spans:
+        print(f"\n=== DEBUG: Scanning '{os.path.basename(pdf_path)}' for font-sizes ===")
     for pno, page in enumerate(doc, start=1):
-        raw = page.get_text("text")
+        raw = page.get_text("text") if spans else " "
         if not raw.strip():
             print(f"\nPage {pno:>2} raw text: <empty or image-only>\n")
-        else:
+        elif spans:
             print(f"\nPage {pno:>2} raw text preview:\n{raw[:200]!r}\n")
 
-        for block in page.get_text("dict")["blocks"]:
+        for block in text_blocks(page):
             for line in block.get("lines", []):
                 for span in line["spans"]:
+                    if fresh:
+                        profile.add_span(span)
+                    if not spans:
+                        continue
                     fs  = span["size"]
                     txt = span["text"].strip().replace("\n"," ")
                     if not txt:
                         continue
                     print(f"Page {pno:>2} → '{txt[:30]}' (fs={fs})")
 
+    if fresh:
+        save_sidecar(pdf_path, profile)
+    print_profile(pdf_path, profile)
+    return profile
+
+def print_profile(pdf_path, profile):
+    print(f"\n=== Font profile for '{os.path.basename(pdf_path)}' ===")
+    print(json.dumps(profile.summary(), indent=2))
+
 if __name__ == "__main__":
-    debug_font_sizes(PDF)
+    # python main_debug.py [pdf] [--summary]   (--summary: profile only, no per-span listing)
+    args = [a for a in sys.argv[1:] if a != "--summary"]
+    debug_font_sizes(args[0] if args else PDF, spans="--summary" not in sys.argv)
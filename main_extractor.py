@@ -1,9 +1,11 @@
-import fitz, json, os, re, pickle
-import pandas as pd
+import fitz, re, bisect
+from heading_classifier import BATCH_SIZE, drop_rejected, model_for
+from native_toc import toc_outline
+from page_text import has_text
+from pdf_source import open_source, source_title
+from profiling import NULL_METRICS
 
-MODEL_PATH = 'heading_model.pkl'
-with open(MODEL_PATH, 'rb') as mf:
-    clf = pickle.load(mf)
+MODEL_PATH = 'heading_model.pkl'  # loaded lazily by heading_classifier.load_model
 
 stops = {"and","the","of","in","to","for","with","on","by","at","from"}
 
@@ -38,24 +40,73 @@ def heuristic_heading(text, prev_blank, next_blank, fs, max_fs):
         reasons.append('bullet/bold prefix')
     return (bool(reasons), reasons)
 
+# ---------- page model (each page parsed exactly once) ----------
+
+SPAN_SEP = '\x00'
+
+def build_page_model(page):
+    """Parse a page once and index its block lines and spans for reuse."""
+    if not has_text(page):
+        # image-only page: nothing to parse (TEXTFLAGS_BLOCKS already leaves images out)
+        return {'lines': [], 'texts': [], 'joined': '', 'offsets': [], 'sizes': [], 'fonts': []}
+    tp = page.get_textpage(flags=fitz.TEXTFLAGS_BLOCKS)
+    lines = [ln.strip() for blk in page.get_text('blocks', textpage=tp) for ln in blk[4].split('\n')]
+    spans = [s for b in page.get_text('dict', textpage=tp)['blocks'] for l in b.get('lines', []) for s in l.get('spans', [])]
+    texts = [s['text'] for s in spans]
+    offsets, pos = [], 0
+    for t in texts:
+        offsets.append(pos)
+        pos += len(t) + 1
+    return {
+        'lines': lines,
+        'texts': texts,
+        'joined': SPAN_SEP.join(texts),
+        'offsets': offsets,
+        'sizes': [s['size'] for s in spans],
+        'fonts': [s.get('font', '') for s in spans],
+    }
+
+def find_span(model, txt):
+    """Return (size, font) of the first span containing txt, or None."""
+    if SPAN_SEP in txt:
+        idx = next((i for i, t in enumerate(model['texts']) if txt in t), None)
+    else:
+        # a match cannot cross a separator, so the first hit lies in the first matching span
+        at = model['joined'].find(txt)
+        idx = bisect.bisect_right(model['offsets'], at) - 1 if at >= 0 else None
+    if idx is None:
+        return None
+    return model['sizes'][idx], model['fonts'][idx]
+
 # ---------- main extractor ----------
 
-def extract_outline(pdf_path):
-    doc = fitz.open(pdf_path)
+def extract_outline(pdf_path, batch_size=BATCH_SIZE, toc='verify', metrics=NULL_METRICS, classifier='features'):
+    model_path = model_for(classifier, MODEL_PATH)  # 'text': the traingemini.py model scores the raw lines
+    with metrics.stage('open'):
+        doc = open_source(pdf_path)  # a path, or bytes / mmap (see pdf_source)
     if doc.is_encrypted and not doc.authenticate(''):
-        title = os.path.splitext(os.path.basename(pdf_path))[0]
-        return {'title': title, 'outline': []}
+        return {'title': source_title(pdf_path), 'outline': []}
+
+    title = (doc.metadata or {}).get('title', source_title(pdf_path))
 
-    title = (doc.metadata or {}).get('title', os.path.splitext(os.path.basename(pdf_path))[0])
+    # embedded bookmarks, when present and plausible, replace the span analysis (see native_toc)
+    with metrics.stage('toc'):
+        native = toc_outline(doc, toc)
+    if native is not None:
+        metrics.count('toc_used')
+        return {'title': title, 'outline': native}
 
-    sizes = [s['size'] for p in doc for b in p.get_text('dict')['blocks'] for l in b.get('lines', []) for s in l.get('spans', [])]
-    max_fs, min_fs = max(sizes, default=12), min(sizes, default=10)
+    with metrics.stage('get_text'):
+        pages = [build_page_model(p) for p in doc]
+    max_fs = max((max(m['sizes']) for m in pages if m['sizes']), default=12)
+    min_fs = min((min(m['sizes']) for m in pages if m['sizes']), default=10)
 
-    outline, seen = [], set()
+    outline, seen, pending = [], set(), []
+    n_hits = 0
+    t_lines = metrics.clock()
 
-    for pno, page in enumerate(doc, 1):
-        raw_lines = [ln for blk in page.get_text('blocks') for ln in blk[4].split('\n')]
-        lines = [ln.strip() for ln in raw_lines]
+    for pno, model in enumerate(pages, 1):
+        lines = model['lines']
         for idx, txt in enumerate(lines):
             if not txt or txt in seen:
                 continue
@@ -63,21 +114,21 @@ def extract_outline(pdf_path):
             prev_blank = idx == 0 or lines[idx-1] == ''
             next_blank = idx == len(lines)-1 or lines[idx+1] == ''
 
-            span = next((s for b in page.get_text('dict')['blocks'] for l in b.get('lines', []) for s in l.get('spans', []) if txt in s['text']), None)
+            span = find_span(model, txt)
             if not span:
                 continue
-            fs = span['size']; fonts = [span.get('font','')]
+            fs, font = span; fonts = [font]
 
             heuristic_hit, h_reasons = heuristic_heading(txt, prev_blank, next_blank, fs, max_fs)
             reason = []
             if heuristic_hit:
+                n_hits += 1
                 reason.extend(h_reasons)
             else:
-                feats = extract_features({'text':txt,'font_size':fs,'font':fonts})
-                if clf.predict(pd.DataFrame([feats]))[0] == 1:
-                    reason.append('ML classifier positive')
-                else:
-                    continue  # not a heading
+                # decided later in one batched predict call
+                pending.append((len(outline), txt if classifier == 'text' else
+                                extract_features({'text':txt,'font_size':fs,'font':fonts})))
+                reason.append('ML classifier positive')
 
             # level selection
             if fs >= (max_fs - 0.5):
@@ -97,13 +148,18 @@ def extract_outline(pdf_path):
                 'reason': '; '.join(reason)
             })
 
+    metrics.lap('heuristics', t_lines)
+    metrics.count('pages', len(pages))
+    metrics.count('pages_skipped', sum(not m['texts'] for m in pages))
+    metrics.count('spans', sum(len(m['texts']) for m in pages))
+    metrics.count('lines', sum(len(m['lines']) for m in pages))
+    metrics.count('candidates', len(outline))
+    metrics.count('heuristic_hits', n_hits)
+    outline = drop_rejected(outline, pending, model_path, batch_size, metrics)
     return {'title': title, 'outline': outline}
 
 if __name__ == '__main__':
-    in_dir, out_dir = 'input','output'
-    os.makedirs(out_dir, exist_ok=True)
-    for fn in sorted(os.listdir(in_dir)):
-        if fn.lower().endswith('.pdf'):
-            res = extract_outline(os.path.join(in_dir, fn))
-            with open(os.path.join(out_dir, fn.replace('.pdf','.json')), 'w') as fp:
-                json.dump(res, fp, indent=2)
+    # input/ → output/, one worker process per core (see batch_runner.py for options)
+    import sys
+    from batch_runner import main as run_batch
+    sys.exit(run_batch(['--extractor', 'main_extractor'] + sys.argv[1:]))
@@ -0,0 +1,120 @@
+"""
+Memory ceiling for very large documents.
+
+    gemini.extract_outline('archive.pdf', max_rss_mb=512)
+    python main1.py archive.pdf --max-rss 512
+    python batch_runner.py --max-rss-mb 512
+
+Most of what a long extraction accumulates isn't Python's: MuPDF keeps every
+PDF object it has parsed for as long as the document is open (15-20 KB per
+page on the synthetic benchmarks), and its store keeps decoded fonts and
+images.  MemoryBudget.pages() walks the document in chunks of chunk_pages
+pages, each read from a freshly opened copy that is closed when the chunk
+ends, and empties the store and collects garbage in between, so what MuPDF
+holds is bounded by one chunk whatever the page count.  Headings collected
+on the way go into a SpillList, which moves them to a temporary file while
+RSS is over the ceiling, so only the final result is ever held whole.  RSS
+is sampled on every page; peak_mb() is the highest value seen.
+"""
+import gc, json, os, sys, tempfile
+import fitz
+from pdf_source import open_source
+
+CHUNK_PAGES = 200  # a fresh copy has to find its first page again, which costs more the further in it is
+
+def rss_bytes():
+    """Current resident set size of this process (the peak where /proc isn't available)."""
+    try:
+        with open('/proc/self/statm') as fp:
+            return int(fp.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb() * 2**20
+
+def peak_rss_mb():
+    """Highest RSS this process has had, in MB (0 where the resource module is missing)."""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024  # bytes on macOS, KB elsewhere
+
+class MemoryBudget:
+    def __init__(self, max_rss_mb, source=None, chunk_pages=CHUNK_PAGES):
+        """source is what the document was opened from (path or in-memory, see pdf_source); chunks reopen it."""
+        self.limit = max_rss_mb * 2**20
+        self.source = source
+        self.chunk_pages = chunk_pages
+        self.peak = rss_bytes()
+        self.chunks = 0
+
+    def over(self):
+        rss = rss_bytes()
+        self.peak = max(self.peak, rss)
+        return rss > self.limit
+
+    def peak_mb(self):
+        return round(self.peak / 2**20, 1)
+
+    def release(self):
+        gc.collect()
+        fitz.TOOLS.store_shrink(100)  # drop every cached font/image MuPDF can rebuild
+
+    def _open(self, doc):
+        source = self.source if self.source is not None else doc.name or None
+        if source is None:
+            return doc  # nothing to reopen from: chunks share the caller's document
+        part = open_source(source)
+        if part.needs_pass:
+            part.authenticate('')
+        return part
+
+    def pages(self, doc):
+        """The pages of doc, in order, like `for page in doc`, but chunk by chunk."""
+        start, n = 0, doc.page_count
+        while start < n:
+            part = self._open(doc)
+            try:
+                for pno in range(start, min(start + self.chunk_pages, n)):
+                    yield part[pno]
+                    self.over()  # samples the peak
+                    start = pno + 1
+            finally:
+                if part is not doc:
+                    part.close()
+            self.chunks += 1
+            self.release()
+
+class SpillList:
+    """Append-only list of JSON records that moves to a temporary file while RSS is over the budget."""
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.spilled = 0
+        self._items, self._fp = [], None
+
+    def __len__(self):
+        return self.spilled + len(self._items)
+
+    def extend(self, items):
+        self._items.extend(items)
+        if self._items and self.budget.over():
+            if self._fp is None:
+                self._fp = tempfile.TemporaryFile('w+', encoding='utf-8')
+            self._fp.writelines(json.dumps(item) + '\n' for item in self._items)
+            self.spilled += len(self._items)
+            self._items = []
+
+    def __iter__(self):
+        # spilled records are always the older ones
+        if self._fp is not None:
+            self._fp.seek(0)
+            for line in self._fp:
+                yield json.loads(line)
+            self._fp.seek(0, os.SEEK_END)
+        yield from self._items
+
+    def close(self):
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
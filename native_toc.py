@@ -0,0 +1,67 @@
+"""
+Fast path: use the PDF's own bookmark tree (doc.get_toc()) as the outline.
+
+Modes for the extractors' `toc` option:
+    'off'    – always run the span analysis
+    'trust'  – use any plausible embedded outline without opening a page
+    'verify' – use it only if the titles are found on a small sample of their pages
+
+Entries taken from the bookmark tree have no measured size: their
+'font_size' is None (null in the JSON) and their 'reason' is 'embedded
+outline'.  Pass toc='off' where every heading needs a font size.
+Bookmarks whose pages go backwards aren't used, so an outline, like the
+span analysis's, is always in page order.
+"""
+import re
+
+TOC_MODES = ('off', 'trust', 'verify')
+VERIFY_PAGES = 3
+VERIFY_MIN_MATCH = 0.67
+
+def _norm(text):
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+def plausible_toc(doc):
+    """Return the embedded [level, title, page] entries if they look usable (in page order), else None."""
+    try:
+        toc = doc.get_toc(simple=True)
+    except Exception:
+        return None
+    if not toc:
+        return None
+    n = doc.page_count
+    if toc[0][0] != 1:
+        return None
+    for (prev_lvl, _, prev_page), (lvl, title, page) in zip([(0, '', 1)] + toc, toc):
+        if lvl > prev_lvl + 1 or not title.strip() or not prev_page <= page <= n:
+            return None
+    return toc
+
+def verify_toc(doc, toc, sample=VERIFY_PAGES, min_match=VERIFY_MIN_MATCH):
+    """Check an evenly spaced sample of entries: is the title on its target page?"""
+    step = max(1, len(toc) // sample)
+    picks = toc[::step][:sample]
+    page_text = {}
+    hits = 0
+    for _, title, page in picks:
+        if page not in page_text:
+            page_text[page] = _norm(doc[page - 1].get_text('text'))
+        hits += _norm(title) in page_text[page]
+    return hits / len(picks) >= min_match
+
+def toc_outline(doc, mode='verify'):
+    """Map the embedded outline to the {level, text, page} schema, or return None to fall back."""
+    if mode == 'off':
+        return None
+    if mode not in TOC_MODES:
+        raise ValueError(f'toc must be one of {TOC_MODES}, got {mode!r}')
+    toc = plausible_toc(doc)
+    if toc is None or (mode == 'verify' and not verify_toc(doc, toc)):
+        return None
+    return [{
+        'level': f'H{min(lvl, 4)}',
+        'text': title.strip(),
+        'page': page,
+        'font_size': None,  # not measured, see the module docstring
+        'reason': 'embedded outline',
+    } for lvl, title, page in toc]
@@ -0,0 +1,28 @@
+"""
+Text-only page parsing shared by the extractors.
+
+page.get_text('dict') with its default flags also decodes every image on the
+page into the block list, although the extractors only ever read 'lines'.
+TEXT_FLAGS keeps everything else the default does and drops the images, so
+the text blocks come out the same.  Pages that reference no fonts (scanned,
+image-only pages, what main_debug reports as "<empty or image-only>") can't
+hold any text and are skipped without being parsed at all.
+"""
+import fitz
+
+TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+def has_text(page):
+    # reads the page's font resources (form XObjects included), not its content stream
+    return bool(page.get_fonts())
+
+def text_blocks(page, clip=None, flags=TEXT_FLAGS):
+    """The 'dict' blocks of a page without image blocks; [] for image-only pages."""
+    if not has_text(page):
+        return []
+    return page.get_text('dict', flags=flags, clip=clip)['blocks']
+
+def band_clip(page, thresh):
+    """Page rect minus the top/bottom thresh fraction, as used for gemini's header/footer bands."""
+    r = page.rect
+    return fitz.Rect(r.x0, r.height * thresh, r.x1, r.height * (1 - thresh))
@@ -0,0 +1,144 @@
+"""
+Bounded extraction: a subset of the pages, a wall-clock deadline, and resuming the rest later.
+
+    gemini.extract_outline('report.pdf', pages='1-10,~10')       # first 10 pages + 10 spread over the rest
+    gemini.extract_outline('report.pdf', deadline=2.0, page_cache='output/report.pages.json')
+    main1.extract_headings_from_pdf('report.pdf', deadline=2.0)
+    future = resume('report.pdf', 'output/report.json', page_cache='output/report.pages.json')
+
+The deadline is checked between pages: once it has passed, no further page
+is started and the headings of the pages done so far are returned (after
+the model has seen their undecided lines, which isn't counted).  The
+document-level steps (font size range, duplicates, levels, repeated
+headers/footers) then only see those pages, so a heading's level can differ
+from a full run.  A bounded result carries two extra keys:
+
+    'complete'  True only if every page of the document was read
+    'coverage'  {'pages': done, 'of': page count, 'ranges': [[first, last], ...],
+                 'stopped': 'deadline' | 'pages' | None, 'secs': elapsed}
+
+With a page_cache (see incremental), every page a bounded gemini run reads
+is kept in the cache, so resume() -- or simply the next run -- only parses
+the pages that are still missing; a series of short runs completes the
+document bit by bit (each such run parses at least one missing page, even
+past the deadline, since recognising the cached pages takes time too).  main1 has no page cache and resumes with a full run.
+"""
+import json, os, time
+
+def parse_pages(spec, n_pages):
+    """
+    Page numbers for a spec such as '1-10,25,40-' (1-based, inclusive, '40-' runs to the end); '~k'
+    adds k pages spread evenly over the pages the rest of the spec leaves out, so '1-10,~10' is the
+    first 10 pages plus 10 from the rest.  Numbers past the end are dropped.
+    """
+    pages, samples = set(), 0
+    for part in str(spec).replace(' ', '').split(','):
+        if not part:
+            continue
+        if part.startswith('~'):
+            samples += int(part[1:])
+        elif '-' in part:
+            lo, hi = part.split('-', 1)
+            pages.update(range(int(lo or 1), min(int(hi) if hi else n_pages, n_pages) + 1))
+        else:
+            pages.add(int(part))
+    rest = [p for p in range(1, n_pages + 1) if p not in pages]
+    k = min(samples, len(rest))
+    pages.update(rest[(i * len(rest)) // k] for i in range(k))
+    return sorted(p for p in pages if 1 <= p <= n_pages)
+
+def select_pages(pages, n_pages):
+    """A pages argument (None, a spec string or page numbers) as a sorted list of valid page numbers."""
+    if pages is None:
+        return list(range(1, n_pages + 1))
+    if isinstance(pages, str):
+        return parse_pages(pages, n_pages)
+    return sorted({p for p in pages if 1 <= p <= n_pages})
+
+class Deadline:
+    """Wall-clock budget started at construction; seconds=None never expires."""
+
+    def __init__(self, seconds=None):
+        self.seconds = seconds
+        self.start = time.perf_counter()
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def expired(self):
+        return self.seconds is not None and self.elapsed() >= self.seconds
+
+def iter_pages(doc, pages=None, deadline=None, done=None, budget=None):
+    """
+    (page number, page) for the selected pages of doc in order (see select_pages), until deadline
+    expires; the numbers handed out are appended to done.  budget: see memory_budget.
+    """
+    wanted = select_pages(pages, doc.page_count)
+    if budget is not None:
+        keep = set(wanted)
+        source = ((pno, page) for pno, page in enumerate(budget.pages(doc), 1) if pno in keep)
+    elif pages is None:
+        source = enumerate(doc, 1)
+    else:
+        source = ((pno, doc[pno - 1]) for pno in wanted)
+    for pno, page in source:
+        if deadline is not None and deadline.expired():
+            return
+        if done is not None:
+            done.append(pno)
+        yield pno, page
+
+def page_ranges(numbers):
+    """[[first, last], ...] runs of consecutive numbers in a sorted list."""
+    ranges = []
+    for n in numbers:
+        if ranges and n == ranges[-1][1] + 1:
+            ranges[-1][1] = n
+        else:
+            ranges.append([n, n])
+    return ranges
+
+def mark_coverage(result, done, n_pages, deadline=None):
+    """Add 'complete' and 'coverage' (see the module docstring) to a result dict and return it."""
+    stopped = None
+    if len(done) < n_pages:
+        stopped = 'deadline' if deadline is not None and deadline.expired() else 'pages'
+    result['complete'] = len(done) == n_pages
+    result['coverage'] = {
+        'pages': len(done),
+        'of': n_pages,
+        'ranges': page_ranges(done),
+        'stopped': stopped,
+        'secs': round(deadline.elapsed(), 3) if deadline is not None else None,
+    }
+    return result
+
+# ---------- resuming ----------
+
+_pool = None
+
+def _resume(extractor, pdf_path, json_output, options):
+    if extractor == 'main1':
+        from main1 import extract_headings_from_pdf
+        return extract_headings_from_pdf(pdf_path, json_output=json_output, **options)
+    import gemini
+    result = gemini.extract_outline(pdf_path, **options)
+    if json_output:
+        tmp = json_output + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as fp:
+            json.dump(result, fp, indent=2)
+        os.replace(tmp, json_output)
+    return result
+
+def resume(pdf_path, json_output=None, extractor='gemini', **options):
+    """
+    Finish a document in a background process: a full, unbounded run (pass the same page_cache as
+    the bounded run so gemini only parses the missing pages), written to json_output.  Returns a
+    concurrent.futures.Future of the result, run by a pdf_source.process_pool worker.
+    """
+    global _pool
+    if _pool is None:
+        from pdf_source import process_pool
+        _pool = process_pool(1)
+    options = {k: v for k, v in options.items() if k not in ('pages', 'deadline', 'metrics')}
+    return _pool.submit(_resume, extractor, os.fspath(pdf_path), json_output, options)
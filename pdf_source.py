@@ -0,0 +1,49 @@
+"""
+Open a PDF from a path or from memory.
+
+The extractors' pdf_path argument also accepts bytes, bytearray, memoryview
+or mmap objects (optionally wrapped in NamedPDF to give the document a name
+for its fallback title).  In-memory sources are handed to
+fitz.open(stream=...) as a memoryview, which PyMuPDF reads in place: it
+would copy a bytearray and doesn't accept an mmap directly.
+
+process_pool() is the worker pool the parallel paths (sharded, partial,
+async_extract) hand documents to.
+"""
+import multiprocessing, os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import fitz
+
+NamedPDF = namedtuple('NamedPDF', 'data name')
+
+def is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+def as_stream(source):
+    data = source.data if isinstance(source, NamedPDF) else source
+    return data if isinstance(data, bytes) else memoryview(data).cast('B')
+
+def open_source(source):
+    """fitz Document for a path or an in-memory PDF, without copying in-memory bytes."""
+    if is_path(source):
+        return fitz.open(source)
+    return fitz.open(stream=as_stream(source), filetype='pdf')
+
+def source_title(source):
+    """Fallback title: the file name without extension ('' for an unnamed in-memory PDF)."""
+    name = source if is_path(source) else source.name if isinstance(source, NamedPDF) else ''
+    return os.path.splitext(os.path.basename(os.fspath(name)))[0]
+
+# ---------- worker processes ----------
+
+def process_pool(workers, **kwargs):
+    """
+    ProcessPoolExecutor (kwargs: initializer, initargs) whose workers come from the multiprocessing
+    fork server where there is one.  A plain fork() isn't safe from a parent with the feeder threads of
+    a live (or just killed) pool; the fork server is a clean single-threaded process.  Scripts that use
+    one need the usual `if __name__ == '__main__':` guard.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context('forkserver' if 'forkserver' in methods else None)
+    return ProcessPoolExecutor(workers, mp_context=ctx, **kwargs)
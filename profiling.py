@@ -0,0 +1,99 @@
+"""
+Per-stage timers and counters for the extraction pipeline.
+
+Extractors take an optional `metrics` argument; by default it is
+NULL_METRICS, whose hooks do nothing, so an unprofiled run pays one no-op
+call per page rather than per line.
+
+    python profiling.py gemini input/sample.pdf                  # stage times + counters
+    python profiling.py gemini input/sample.pdf --cprofile out.prof
+"""
+import argparse, cProfile, importlib, io, json, pstats, sys, time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+
+# ---------- metrics ----------
+
+class Metrics:
+    """Accumulates wall time per stage (seconds) and named counters."""
+
+    def __init__(self):
+        self.stages = defaultdict(float)
+        self.counts = Counter()
+
+    @contextmanager
+    def stage(self, name):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] += time.perf_counter() - t
+
+    def clock(self):
+        return time.perf_counter()
+
+    def lap(self, name, since):
+        """Add the time elapsed since an earlier clock() reading to a stage."""
+        self.stages[name] += time.perf_counter() - since
+
+    def count(self, name, n=1):
+        self.counts[name] += n
+
+    def as_dict(self):
+        return {'stages_secs': {k: round(v, 6) for k, v in self.stages.items()}, 'counts': dict(self.counts)}
+
+class _NullMetrics:
+    _ctx = nullcontext()
+
+    def stage(self, name):
+        return self._ctx
+
+    def clock(self):
+        return 0.0
+
+    def lap(self, name, since):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+    def as_dict(self):
+        return {}
+
+NULL_METRICS = _NullMetrics()
+
+# ---------- one-document profiling ----------
+
+def profile_document(extractor, pdf_path, cprofile_path=None, top=25, **kwargs):
+    """
+    Run one extractor's extract_outline on pdf_path with metrics enabled.
+    With cprofile_path, also capture a cProfile dump there (and a text summary next to it).
+    Returns (result, metrics dict).
+    """
+    mod = importlib.import_module(extractor)
+    metrics = Metrics()
+    prof = cProfile.Profile() if cprofile_path else None
+    if prof:
+        prof.enable()
+    try:
+        result = mod.extract_outline(pdf_path, metrics=metrics, **kwargs)
+    finally:
+        if prof:
+            prof.disable()
+    if prof:
+        prof.dump_stats(cprofile_path)
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats('cumulative').print_stats(top)
+        with open(cprofile_path + '.txt', 'w') as fp:
+            fp.write(buf.getvalue())
+    return result, metrics.as_dict()
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Profile one extractor on one PDF.')
+    ap.add_argument('extractor', choices=('gemini', 'main_extractor'))
+    ap.add_argument('pdf')
+    ap.add_argument('--cprofile', metavar='OUT.prof', default=None, help='also capture a cProfile dump')
+    args = ap.parse_args()
+    _, m = profile_document(args.extractor, args.pdf, args.cprofile)
+    json.dump(m, sys.stdout, indent=2)
+    print()
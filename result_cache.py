@@ -0,0 +1,128 @@
+"""
+Content-addressed on-disk cache for extractor results.
+
+An entry is keyed by the PDF's content hash, the hash of the model file and
+the extraction parameters, so a hit never opens the PDF.  Entries are plain
+JSON files named <model-hash>-<key>.json holding {"result": ..., "meta": ...},
+where meta is whatever else the caller wants back without opening the PDF
+(batch_runner keeps the page count there); the directory is capped at
+max_bytes and the least recently used entries are evicted first.  Retraining
+the model changes its hash, and invalidate() drops the entries built with
+any other model.
+"""
+import hashlib, inspect, json, os, tempfile
+
+CACHE_DIR = '.outline_cache'
+MAX_BYTES = 256 * 1024 * 1024
+MODEL_PATH = 'heading_model.pkl'
+NON_RESULT_PARAMS = {'batch_size', 'json_output', 'metrics', 'page_cache', 'page_workers'}  # don't change the result, so not part of the key
+
+_digests = {}
+
+# ---------- keys ----------
+
+def file_digest(path):
+    """sha256 of a file, memoized on (path, size, mtime) for the life of the process."""
+    st = os.stat(path)
+    memo = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if memo not in _digests:
+        h = hashlib.sha256()
+        with open(path, 'rb') as fp:
+            for chunk in iter(lambda: fp.read(1 << 20), b''):
+                h.update(chunk)
+        _digests[memo] = h.hexdigest()
+    return _digests[memo]
+
+def model_digest(model_path=MODEL_PATH):
+    # whichever of the pickle / NumPy export heading_classifier would load
+    from heading_classifier import model_file
+    path = model_file(model_path)
+    return file_digest(path)[:16] if os.path.exists(path) else 'nomodel'
+
+def result_params(fn, params):
+    """Explicit params merged with fn's defaults, minus the ones that don't affect output."""
+    bound = inspect.signature(fn).bind_partial(**params)
+    bound.apply_defaults()
+    return {k: v for k, v in bound.arguments.items() if k not in NON_RESULT_PARAMS and k != 'pdf_path'}
+
+def cache_key(fn, pdf_path, params=None, model_path=MODEL_PATH):
+    ident = json.dumps({
+        'fn': f'{fn.__module__}.{fn.__qualname__}',
+        'pdf': file_digest(pdf_path),
+        'params': result_params(fn, params or {}),
+    }, sort_keys=True, default=str)
+    return f'{model_digest(model_path)}-{hashlib.sha256(ident.encode()).hexdigest()}'
+
+# ---------- storage ----------
+
+def get(key, cache_dir=CACHE_DIR, meta=False):
+    """The cached result, or (result, meta) if meta=True; None on a miss."""
+    path = os.path.join(cache_dir, key + '.json')
+    try:
+        with open(path, encoding='utf-8') as fp:
+            entry = json.load(fp)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(entry, dict) or 'result' not in entry:  # written before entries carried meta
+        return None
+    try:
+        os.utime(path)  # mtime doubles as the LRU clock
+    except FileNotFoundError:  # evicted by another process since we read it
+        pass
+    return (entry['result'], entry.get('meta') or {}) if meta else entry['result']
+
+def put(key, result, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES, meta=None):
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as fp:
+        json.dump({'result': result, 'meta': meta or {}}, fp, ensure_ascii=False)
+    os.replace(tmp, os.path.join(cache_dir, key + '.json'))
+    evict(cache_dir, max_bytes)
+
+def _entries(cache_dir):
+    try:
+        return [e for e in os.scandir(cache_dir) if e.name.endswith('.json')]
+    except FileNotFoundError:
+        return []
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:  # workers sharing the cache evict concurrently; already gone is fine
+        pass
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_BYTES):
+    """Remove least recently used entries until the cache fits in max_bytes."""
+    entries = []
+    for e in _entries(cache_dir):
+        try:
+            st = e.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, e.path))
+    total = 0
+    for _, size, path in sorted(entries, reverse=True):
+        total += size
+        if total > max_bytes:
+            _remove(path)
+
+def invalidate(cache_dir=CACHE_DIR, model_path=MODEL_PATH):
+    """Drop entries built with a different model (all entries if model_path is None)."""
+    keep = None if model_path is None else model_digest(model_path) + '-'
+    removed = 0
+    for e in _entries(cache_dir):
+        if keep is None or not e.name.startswith(keep):
+            _remove(e.path)
+            removed += 1
+    return removed
+
+# ---------- wrapper ----------
+
+def cached_extract(fn, pdf_path, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES, model_path=MODEL_PATH, **params):
+    """Return fn(pdf_path, **params), served from the cache when possible."""
+    key = cache_key(fn, pdf_path, params, model_path)
+    result = get(key, cache_dir)
+    if result is None:
+        result = fn(pdf_path, **params)
+        put(key, result, cache_dir, max_bytes)
+    return result
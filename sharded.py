@@ -0,0 +1,153 @@
+"""
+Extraction of one large document with several processes.
+
+    gemini.extract_outline('manual.pdf', page_workers=4)
+    main1.extract_headings_from_pdf('manual.pdf', page_workers=4)
+    python sharded.py gemini manual.pdf --workers 4 -o manual.json
+
+The pages are cut into contiguous ranges (shards) and each shard is parsed
+by a worker that opens its own copy of the file; that per-page work
+(get_text and the page's candidate lines) is nearly all of an extraction's
+time.  Everything that depends on the whole document stays in the parent
+and runs over the shards' results in page order: for gemini the font size
+range, duplicate lines, levels and repeated headers/footers (see
+gemini.outline_from_records), for main1 the size threshold, header/footer
+filter and levels.  The output is therefore the same as a sequential run.
+
+gemini workers also run the model on their shard's undecided lines.  A
+shard doesn't know the document's largest font or the lines of earlier
+shards, so it labels a few lines the parent then doesn't need; the parent
+only predicts what no shard labelled.
+
+Short documents, in-memory sources and callers that are themselves daemon
+processes (batch_runner's workers, which can't have children) are run
+sequentially.  Workers come from pdf_source.process_pool (mind its note on
+`__main__` guards).
+"""
+import argparse, json, math, multiprocessing, os, sys
+
+import gemini
+from heading_classifier import BATCH_SIZE, load_model, model_for, predict_batched
+from native_toc import toc_outline
+from pdf_source import is_path, process_pool
+from profiling import NULL_METRICS
+
+MIN_SHARD_PAGES = 16  # below this a worker spends more time finding its first page than parsing
+
+_pools = {}
+
+def _pool(workers):
+    if workers not in _pools:
+        _pools[workers] = process_pool(workers)
+    return _pools[workers]
+
+def shard_ranges(n_pages, workers):
+    """Contiguous (start, stop) page ranges, about two per worker so a slow shard doesn't hold up the rest."""
+    n = max(1, min(2 * workers, n_pages // MIN_SHARD_PAGES))
+    bounds = [round(i * n_pages / n) for i in range(n + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+def can_shard(source, n_pages, workers):
+    return (bool(workers) and workers > 1 and n_pages >= 2 * MIN_SHARD_PAGES and is_path(source)
+            and not multiprocessing.current_process().daemon)
+
+def _run(fn, source, ranges, workers, *args):
+    futures = [_pool(workers).submit(fn, os.fspath(source), start, stop, *args) for start, stop in ranges]
+    return [f.result() for f in futures]
+
+# ---------- gemini ----------
+
+def _gemini_shard(path, start, stop, header_footer_thresh, table_span_thresh, keep_band, clip, classifier, model_path,
+                  batch_size):
+    doc, _ = gemini.open_pdf(path)
+    try:
+        records = [gemini.page_record(doc[pno], header_footer_thresh, table_span_thresh, keep_band, clip)
+                   for pno in range(start, stop)]
+    finally:
+        doc.close()
+    todo, seen = {}, set()
+    for pno, rec in enumerate(records, start + 1):
+        _, pending, _ = gemini.page_outline(pno, rec['lines'], seen, math.inf, 0, classifier)
+        todo.update((gemini.label_key(f, classifier), f) for _, f in pending)
+    labels = {}
+    if todo:
+        labels = dict(zip(todo, predict_batched(load_model(model_path), list(todo.values()), batch_size)))
+    return records, labels
+
+def extract_outline(pdf_path, page_workers, header_footer_thresh=0.1, table_span_thresh=10, batch_size=BATCH_SIZE,
+                    toc='verify', header_footer='band', metrics=NULL_METRICS, clip_bands=False, classifier='features'):
+    """gemini.extract_outline with the pages parsed by page_workers processes."""
+    with metrics.stage('open'):
+        doc, title = gemini.open_pdf(pdf_path)
+    if doc is None:
+        return {'title': title, 'outline': []}
+    with metrics.stage('toc'):
+        native = toc_outline(doc, toc)
+    if native is not None:
+        metrics.count('toc_used')
+        return {'title': title, 'outline': native}
+    if not can_shard(pdf_path, doc.page_count, page_workers):
+        outline = [h for _, hs in gemini.iter_outline(doc, header_footer_thresh, table_span_thresh, batch_size,
+                                                      header_footer, metrics, clip_bands, classifier) for h in hs]
+        return {'title': title, 'outline': outline}
+
+    keep_band = header_footer == 'repeat'
+    model_path = os.path.abspath(model_for(classifier, gemini.MODEL_PATH))  # workers may not share our cwd
+    ranges = shard_ranges(doc.page_count, page_workers)
+    doc.close()
+    with metrics.stage('get_text'):
+        shards = _run(_gemini_shard, pdf_path, ranges, page_workers, header_footer_thresh, table_span_thresh,
+                      keep_band, clip_bands and not keep_band, classifier, model_path, batch_size)
+    records, labels = [], {}
+    for recs, shard_labels in shards:
+        records.extend(recs)
+        labels.update(shard_labels)
+    metrics.count('pages', len(records))
+    metrics.count('shards', len(ranges))
+    outline, _ = gemini.outline_from_records(records, labels, model_path, classifier, batch_size, header_footer, metrics)
+    return {'title': title, 'outline': outline}
+
+# ---------- main1 ----------
+
+def _main1_shard(path, start, stop):
+    import fitz
+    from font_profile import FontProfile
+    from main1 import collect_page_spans
+    from span_store import SpanStore
+    store, profile = SpanStore(), FontProfile()
+    with fitz.open(path) as doc:
+        for pno in range(start, stop):
+            collect_page_spans(doc[pno], pno + 1, profile, store)
+    return store, profile
+
+def collect_spans_sharded(pdf_path, n_pages, workers):
+    """main1.collect_spans over page ranges in worker processes; returns (SpanStore, FontProfile)."""
+    from font_profile import FontProfile
+    from span_store import SpanStore
+    ranges = shard_ranges(n_pages, workers) if can_shard(pdf_path, n_pages, workers) else [(0, n_pages)]
+    if len(ranges) == 1:
+        return _main1_shard(os.fspath(pdf_path), 0, n_pages)
+    store, profile = SpanStore(), FontProfile()
+    for shard_store, shard_profile in _run(_main1_shard, pdf_path, ranges, workers):
+        store.extend(shard_store)
+        profile.update(shard_profile)
+    return store, profile
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Extract one PDF with its pages split across processes.')
+    ap.add_argument('extractor', choices=('gemini', 'main1'))
+    ap.add_argument('pdf')
+    ap.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    ap.add_argument('-o', '--output', default=None, help='output JSON (default: stdout)')
+    args = ap.parse_args()
+    if args.extractor == 'gemini':
+        result = extract_outline(args.pdf, args.workers)
+    else:
+        from main1 import extract_headings_from_pdf
+        result = extract_headings_from_pdf(args.pdf, page_workers=args.workers)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fp:
+            json.dump(result, fp, indent=2, ensure_ascii=False)
+    else:
+        json.dump(result, sys.stdout, indent=2, ensure_ascii=False)
+        print()
@@ -0,0 +1,77 @@
+"""
+Columnar span store used by main.py / main1.py.
+
+Instead of one dict per span, spans are appended to flat typed columns
+(size, flags, bbox, colour, page, page height) with interned text and font
+ids.  freeze() turns the columns into NumPy arrays so filtering, level
+assignment and (page, y) sorting run vectorized; dicts are only built for
+the headings that end up in the output.
+"""
+from array import array
+
+class SpanStore:
+    def __init__(self):
+        self._cols = {
+            'size': array('d'), 'flags': array('q'), 'color': array('q'), 'page': array('q'),
+            'page_height': array('d'), 'bbox': array('d'), 'text': array('q'), 'font': array('q'),
+        }
+        self.texts, self._text_ids = [], {}
+        self.fonts, self._font_ids = [], {}
+
+    def __len__(self):
+        return len(self._cols['size'])
+
+    def _intern(self, value, values, ids):
+        i = ids.get(value)
+        if i is None:
+            i = ids[value] = len(values)
+            values.append(value)
+        return i
+
+    def add(self, span, text, page, page_height=0.0):
+        """Append one PyMuPDF span; text is the (already stripped) text to keep."""
+        c = self._cols
+        bbox = span.get('bbox') or (0.0, 0.0, 0.0, 0.0)
+        c['size'].append(span.get('size', 0))
+        c['flags'].append(span.get('flags', 0))
+        c['color'].append(span.get('color', 0))
+        c['page'].append(page)
+        c['page_height'].append(page_height)
+        c['bbox'].extend(bbox)
+        c['text'].append(self._intern(text, self.texts, self._text_ids))
+        c['font'].append(self._intern(span.get('font', ''), self.fonts, self._font_ids))
+
+    def extend(self, other):
+        """Append another store's spans (e.g. from a later page range), re-interning its texts and fonts."""
+        text_ids = [self._intern(t, self.texts, self._text_ids) for t in other.texts]
+        font_ids = [self._intern(f, self.fonts, self._font_ids) for f in other.fonts]
+        for k, col in other._cols.items():
+            if k == 'text':
+                col = (text_ids[i] for i in col)
+            elif k == 'font':
+                col = (font_ids[i] for i in col)
+            self._cols[k].extend(col)
+
+    def freeze(self):
+        """Return the columns as NumPy arrays (bbox as an (n, 4) array, y = bbox top)."""
+        import numpy as np
+        dtype = lambda v: np.float64 if v.typecode == 'd' else np.int64
+        # zero-copy views over the array buffers; the store can't grow after this
+        cols = {k: np.frombuffer(v, dtype=dtype(v)) if len(v) else np.zeros(0, dtype=dtype(v))
+                for k, v in self._cols.items()}
+        cols['bbox'] = cols['bbox'].reshape(-1, 4)
+        cols['y'] = cols['bbox'][:, 1]
+        return cols
+
+# ---------- vectorized helpers ----------
+
+def size_ranks(sizes):
+    """1 for the largest distinct size, 2 for the next, ... (same as ranking a set of sizes)."""
+    import numpy as np
+    uniq = np.unique(sizes)
+    return len(uniq) - np.searchsorted(uniq, sizes)
+
+def page_y_order(page, y):
+    """Indices sorted by (page, y), stable like list.sort."""
+    import numpy as np
+    return np.lexsort((y, page))
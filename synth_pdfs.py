@@ -0,0 +1,97 @@
+"""
+Synthetic PDF generator for benchmarking the extractors.
+
+    python synth_pdfs.py --out bench_pdfs --pages 10 200 --tables --columns 2
+
+Every knob maps to a code path in the extractors: heading density and
+numbered sections feed the heuristics/ML fallback, running header/footer
+lines exercise repeated-header detection, table rows put many small spans
+on one line, two-column pages change block/line order, and images add image
+blocks (every fifth page becomes a text-free "scan").
+"""
+import argparse, os, random
+import fitz  # PyMuPDF
+
+WORDS = ("the of and to in for with on by at from report section data result method analysis "
+         "system design value table figure model review process policy growth rural education").split()
+
+def _sentence(rng, n):
+    return ' '.join(rng.choice(WORDS) for _ in range(n)).capitalize() + '.'
+
+def make_pdf(path, pages=10, headings_per_page=4, numbered=True, header_footer=True,
+             tables=False, columns=1, seed=0, toc=False, images=False):
+    """Write a synthetic document to path and return its page count."""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    toc_entries, sec = [], 0
+    # separate rng, so the pixel data doesn't shift the generated text
+    pix = fitz.Pixmap(fitz.csRGB, 600, 400, random.Random(seed).randbytes(600 * 400 * 3), False) if images else None
+    for pno in range(1, pages + 1):
+        page = doc.new_page()
+        width, height = page.rect.width, page.rect.height
+        if images:
+            if pno % 5 == 0:
+                page.insert_image(page.rect, pixmap=pix)  # scanned page: image only
+                continue
+            page.insert_image(fitz.Rect(width - 232, height - 200, width - 72, height - 90), pixmap=pix)
+        if header_footer:
+            page.insert_text((72, 36), 'Synthetic Benchmark Report', fontsize=9)
+            page.insert_text((width / 2 - 20, height - 30), f'Page {pno}', fontsize=9)
+
+        col_w = (width - 144) / columns
+        for col in range(columns):
+            x, y = 72 + col * col_w, 80
+            per_col = max(1, headings_per_page // columns) if headings_per_page else 0
+            for h in range(per_col):
+                sec += 1
+                title = f'{sec}. {rng.choice(WORDS).title()} {rng.choice(WORDS).title()}' if numbered else \
+                    f'{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} Overview'
+                page.insert_text((x, y), title, fontsize=16 if h == 0 else 13, fontname='hebo')
+                toc_entries.append([1 if h == 0 else 2, title, pno])
+                y += 22
+                for _ in range(rng.randint(3, 6)):
+                    if y > height - 120:
+                        break
+                    page.insert_text((x, y), _sentence(rng, max(3, int(col_w / 30))), fontsize=10)
+                    y += 13
+                y += 10
+            if tables and y < height - 100:
+                for row in range(6):
+                    for c in range(12):
+                        # alternate fonts so each cell is its own span on the row's line
+                        page.insert_text((x + c * (col_w / 12), y), str(rng.randint(0, 999)), fontsize=8,
+                                         fontname='hebo' if c % 2 else 'helv')
+                    y += 11
+    if toc and toc_entries:
+        doc.set_toc(toc_entries)
+    doc.save(path)
+    return pages
+
+def make_suite(out_dir, page_counts=(10, 100), **kwargs):
+    """Generate one document per page count; returns the list of paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for n in page_counts:
+        tag = '_'.join([f'p{n}'] + [f'{k}{int(v)}' for k, v in sorted(kwargs.items()) if k not in ('seed',)])
+        path = os.path.join(out_dir, f'synth_{tag}.pdf')
+        make_pdf(path, pages=n, **kwargs)
+        paths.append(path)
+    return paths
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Generate synthetic PDFs for benchmarking.')
+    ap.add_argument('--out', default='bench_pdfs')
+    ap.add_argument('--pages', type=int, nargs='+', default=[10, 100])
+    ap.add_argument('--headings-per-page', type=int, default=4)
+    ap.add_argument('--no-numbered', action='store_true')
+    ap.add_argument('--no-header-footer', action='store_true')
+    ap.add_argument('--tables', action='store_true')
+    ap.add_argument('--columns', type=int, default=1)
+    ap.add_argument('--toc', action='store_true', help='embed a bookmark tree matching the headings')
+    ap.add_argument('--images', action='store_true', help='add an image per page and image-only pages')
+    ap.add_argument('--seed', type=int, default=0)
+    args = ap.parse_args()
+    for p in make_suite(args.out, args.pages, headings_per_page=args.headings_per_page,
+                        numbered=not args.no_numbered, header_footer=not args.no_header_footer,
+                        tables=args.tables, columns=args.columns, toc=args.toc, images=args.images, seed=args.seed):
+        print(p)
@@ -0,0 +1,18 @@
+import os, sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+@pytest.fixture(autouse=True)
+def repo_cwd(monkeypatch):
+    # the extractors find heading_model.* relative to the working directory
+    monkeypatch.chdir(ROOT)
+
+@pytest.fixture(scope='session')
+def synth_pdf(tmp_path_factory):
+    """120-page synthetic report: running header/footer, numbered headings, tables."""
+    from synth_pdfs import make_pdf
+    path = str(tmp_path_factory.mktemp('synth') / 'synth.pdf')
+    make_pdf(path, pages=120, tables=True)
+    return path
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+import batch_runner
+
+def test_output_path_swaps_any_case_of_extension():
+    assert batch_runner.output_path('in/Report.PDF', 'out') == os.path.join('out', 'Report.json')
+    assert batch_runner.output_path('in/a.pdf.pdf', 'out') == os.path.join('out', 'a.pdf.json')
+
+@pytest.mark.parametrize('argv', [
+    ['--extractor', 'main_extractor', '--pages', '1'],
+    ['--extractor', 'main_extractor', '--clip-bands'],
+    ['--extractor', 'main_extractor', '--deadline', '0'],
+])
+def test_gemini_only_options_are_rejected_up_front(argv, capsys):
+    with pytest.raises(SystemExit):
+        batch_runner.main(argv + ['--input', 'nonexistent'])
+    assert 'gemini only' in capsys.readouterr().err
+
+@pytest.mark.parametrize('spec', ['abc', '1-x', '~two'])
+def test_bad_page_spec_is_rejected_up_front(spec, capsys):
+    with pytest.raises(SystemExit):
+        batch_runner.main(['--pages', spec, '--input', 'nonexistent'])
+    assert 'not a page spec' in capsys.readouterr().err
+
+def test_batch_indexes_and_summarises(tmp_path):
+    summary = batch_runner.run_batch('input', str(tmp_path), workers=1)
+    assert summary['files'] == len([f for f in os.listdir('input') if f.lower().endswith('.pdf')])
+    ok = [r for r in summary['results'] if r['status'] == 'ok']
+    assert ok and all(os.path.exists(batch_runner.output_path(r['file'], str(tmp_path))) for r in ok)
+    from heading_index import HeadingIndex
+    with HeadingIndex(str(tmp_path)) as index:
+        assert index.stats()['documents'] == len(ok)
@@ -0,0 +1,52 @@
+import pickle, warnings
+
+import numpy as np
+import pytest
+
+from forest import ForestModel, export_forest
+from heading_classifier import MODEL_PATH, forest_path
+from result_cache import file_digest
+
+sklearn_ensemble = pytest.importorskip('sklearn.ensemble')
+
+def rows_for(model, n=2000, seed=0):
+    """Random rows plus rows sitting exactly on split thresholds, where float32 rounding matters."""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(0, 10, size=(n, model.n_features_in_))
+    X[:, 1:] = np.abs(np.round(X[:, 1:])) % 2  # the flag features are 0/1
+    split = model.left != -1
+    feats, thresh = model.feature[split], model.threshold[split]
+    on_edge = np.tile(X[:1], (len(feats), 1))
+    on_edge[np.arange(len(feats)), feats] = thresh
+    return np.vstack([X, on_edge])
+
+def load_pickle():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # pickled with another sklearn version
+        with open(MODEL_PATH, 'rb') as fp:
+            return pickle.load(fp)
+
+def test_shipped_export_is_current_and_exact():
+    model = ForestModel.load(forest_path(MODEL_PATH))
+    assert model.source_sha256 == file_digest(MODEL_PATH)
+    clf = load_pickle()
+    X = rows_for(model)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # fitted with feature names
+        expected, proba = clf.predict(X), clf.predict_proba(X)
+    np.testing.assert_array_equal(model.predict(X), expected)
+    np.testing.assert_array_equal(model.predict_proba(X), proba)
+
+def test_export_with_missing_values(tmp_path):
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(400, 4))
+    y = (X[:, 0] + X[:, 1] > 0).astype(int)
+    X[rng.random(X.shape) < 0.1] = np.nan
+    clf = sklearn_ensemble.RandomForestClassifier(n_estimators=15, random_state=0).fit(X, y)
+    path = str(tmp_path / 'forest.npz')
+    export_forest(clf, path)
+    model = ForestModel.load(path)
+    X_test = rng.normal(size=(500, 4))
+    X_test[rng.random(X_test.shape) < 0.2] = np.nan
+    np.testing.assert_array_equal(model.predict(X_test), clf.predict(X_test))
+    np.testing.assert_array_equal(model.predict_proba(X_test), clf.predict_proba(X_test))
@@ -0,0 +1,27 @@
+import pytest
+
+from heading_classifier import BATCH_SIZE, check_batch_size, predict_batched
+
+class Echo:
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, X):
+        self.calls += 1
+        return X[:, 0]
+
+ROWS = [[float(i)] + [0.0] * 7 for i in range(10)]
+
+@pytest.mark.parametrize('batch_size, calls', [(1, 10), (3, 4), (10, 1), (None, 1)])
+def test_predict_batched_covers_every_row(batch_size, calls):
+    clf = Echo()
+    assert predict_batched(clf, ROWS, batch_size) == list(range(10))
+    assert clf.calls == calls
+
+@pytest.mark.parametrize('batch_size', [0, -1])
+def test_batch_size_below_one_is_rejected(batch_size):
+    with pytest.raises(ValueError, match='batch_size'):
+        predict_batched(Echo(), ROWS, batch_size)
+
+def test_check_batch_size():
+    assert check_batch_size(None) == BATCH_SIZE and check_batch_size(7) == 7
@@ -0,0 +1,73 @@
+import json, os
+
+import pytest
+
+from heading_index import INDEX_NAME, HeadingIndex
+
+def write(path, result):
+    with open(path, 'w', encoding='utf-8') as fp:
+        json.dump(result, fp)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))  # a rewrite within mtime granularity still counts
+
+@pytest.fixture
+def out_dir(tmp_path):
+    write(tmp_path / 'a.json', {'title': 'A', 'outline': [
+        {'level': 'H1', 'text': 'Introduction to Rural Areas', 'page': 1},
+        {'level': 'H2', 'text': 'Rural development', 'page': 3},
+        {'level': 'H2', 'text': 'Education policy', 'page': 7},
+    ]})
+    write(tmp_path / 'b.json', {'path': 'b.pdf', 'headings': [  # main1: nested, integer levels
+        {'level': 1, 'text': 'Intro', 'page': 1, 'children': [
+            {'level': 2, 'text': 'Development plan', 'page': 2, 'children': []}]},
+        {'level': 1, 'text': 'Budget', 'page': 4, 'children': []},
+    ]})
+    write(tmp_path / 'run_summary.json', {'files': 2})
+    write(tmp_path / 'a.metrics.json', {'outline': []})
+    return tmp_path
+
+def texts(hits):
+    return [(h['file'], h['text']) for h in hits]
+
+def test_update_indexes_outline_files_only(out_dir):
+    with HeadingIndex(str(out_dir)) as index:
+        assert index.update() == (2, 0)
+        assert index.stats()['documents'] == 2 and index.stats()['headings'] == 6
+        assert index.update() == (0, 0)
+    assert os.path.exists(out_dir / INDEX_NAME)
+
+def test_search(out_dir):
+    with HeadingIndex(str(out_dir)) as index:
+        index.update()
+        assert texts(index.search('development')) == [('a.json', 'Rural development'), ('b.json', 'Development plan')]
+        assert texts(index.search('RURAL development')) == [('a.json', 'Rural development')]
+        assert texts(index.search('intro', prefix=True)) == [('a.json', 'Introduction to Rural Areas'),
+                                                             ('b.json', 'Intro')]
+        assert index.search('intro') == [{'file': 'b.json', 'title': '', 'level': 'H1', 'page': 1, 'text': 'Intro',
+                                          'pos': 0}]
+        assert texts(index.search('', levels=['H2'], pages=(3, 9))) == [('a.json', 'Rural development'),
+                                                                       ('a.json', 'Education policy')]
+        assert texts(index.search('rural', levels=['H1'])) == [('a.json', 'Introduction to Rural Areas')]
+        assert texts(index.search('development', files=['b.json'])) == [('b.json', 'Development plan')]
+        assert len(index.search('', limit=2)) == 2
+        assert index.search('nowhere') == [] and index.search('rural nowhere') == []
+
+def test_files(out_dir):
+    with HeadingIndex(str(out_dir)) as index:
+        index.update()
+        assert index.files('development') == ['a.json', 'b.json']
+        assert index.files('dev', prefix=True, pages=(3, 9)) == ['a.json']
+        assert index.files('', levels=['H1'], pages=(4, 4)) == ['b.json']
+        assert index.files('budget rural') == []
+
+def test_update_follows_changes(out_dir):
+    with HeadingIndex(str(out_dir)) as index:
+        index.update()
+        write(out_dir / 'a.json', {'title': 'A', 'outline': [{'level': 'H1', 'text': 'Summary', 'page': 1}]})
+        os.remove(out_dir / 'b.json')
+        assert index.update() == (1, 1)
+        assert index.search('development') == []
+        assert texts(index.search('summary')) == [('a.json', 'Summary')]
+        assert index.stats()['headings'] == 1
+        # nothing of the old rows is left behind in the inverted index
+        assert index.db.execute('SELECT COUNT(*) FROM terms').fetchone()[0] == 1
@@ -0,0 +1,35 @@
+import shutil
+
+import fitz
+import pytest
+
+import gemini
+from profiling import Metrics
+
+@pytest.mark.parametrize('header_footer', ['band', 'repeat'])
+def test_cached_runs_match_full_run(synth_pdf, tmp_path, header_footer):
+    cache = str(tmp_path / 'synth.pages.json')
+    full = gemini.extract_outline(synth_pdf, toc='off', header_footer=header_footer)
+    first, second = Metrics(), Metrics()
+    assert gemini.extract_outline(synth_pdf, toc='off', header_footer=header_footer, page_cache=cache,
+                                  metrics=first) == full
+    assert gemini.extract_outline(synth_pdf, toc='off', header_footer=header_footer, page_cache=cache,
+                                  metrics=second) == full
+    assert first.counts['pages_analysed'] == 120
+    assert second.counts['pages_reused'] == 120 and second.counts['pages_analysed'] == 0
+
+def test_edited_document_matches_full_run(synth_pdf, tmp_path):
+    path, cache = str(tmp_path / 'edited.pdf'), str(tmp_path / 'edited.pages.json')
+    shutil.copy(synth_pdf, path)
+    gemini.extract_outline(path, toc='off', page_cache=cache)
+
+    # change one page and insert another: only those two are parsed again
+    with fitz.open(synth_pdf) as doc:
+        doc[6].insert_text((72, 400), '9.9 A Brand New Section', fontsize=30)
+        doc.insert_page(20, text='INSERTED PAGE', fontsize=40)
+        doc.save(path)
+    metrics = Metrics()
+    result = gemini.extract_outline(path, toc='off', page_cache=cache, metrics=metrics)
+    assert result == gemini.extract_outline(path, toc='off')
+    assert any('Brand New Section' in h['text'] for h in result['outline'])
+    assert metrics.counts['pages_analysed'] == 2 and metrics.counts['pages_reused'] == 119
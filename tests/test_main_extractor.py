@@ -0,0 +1,21 @@
+import json, os
+
+import pytest
+
+import main_extractor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# extract_outline of the original implementation (one get_text('dict') per line) for the PDFs in the
+# tree; the bookmark fast path came later, hence toc='off'
+with open(os.path.join(ROOT, 'tests', 'data', 'main_extractor_baseline.json'), encoding='utf-8') as fp:
+    BASELINE = json.load(fp)
+
+def pdf_path(name):
+    path = os.path.join(ROOT, 'input', name)
+    return path if os.path.exists(path) else os.path.join(ROOT, name)
+
+@pytest.mark.parametrize('name', sorted(BASELINE))
+def test_matches_baseline(name):
+    result = main_extractor.extract_outline(pdf_path(name), toc='off')
+    assert json.loads(json.dumps(result)) == BASELINE[name]
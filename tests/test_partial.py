@@ -0,0 +1,39 @@
+import gemini
+from partial import parse_pages
+
+def test_parse_pages():
+    assert parse_pages('1-3,10,98-', 100) == [1, 2, 3, 10, 98, 99, 100]
+    assert parse_pages('5,200,0', 100) == [5]
+    assert parse_pages('~3', 9) == [1, 4, 7]
+
+def test_samples_come_from_the_rest():
+    pages = parse_pages('1-10,~10', 100)
+    assert len(pages) == 20 and pages[:10] == list(range(1, 11))
+    assert pages[10:] == list(range(11, 101, 9))
+    assert parse_pages('1-5,~10', 8) == list(range(1, 9))
+
+def test_all_pages_match_unbounded_run(synth_pdf):
+    full = gemini.extract_outline(synth_pdf, toc='off')
+    bounded = gemini.extract_outline(synth_pdf, toc='off', pages='1-')
+    assert bounded.pop('complete') is True
+    assert bounded.pop('coverage')['ranges'] == [[1, 120]]
+    assert bounded == full
+
+def test_page_subset_is_marked_partial(synth_pdf):
+    result = gemini.extract_outline(synth_pdf, toc='off', pages='1-10,~10')
+    assert result['complete'] is False
+    assert result['coverage']['pages'] == 20 and result['coverage']['stopped'] == 'pages'
+    assert {h['page'] for h in result['outline']} <= set(parse_pages('1-10,~10', 120))
+
+def test_embedded_outline_respects_pages(tmp_path):
+    import fitz
+    doc = fitz.open()
+    for i in range(6):
+        doc.new_page().insert_text((72, 72), f'Chapter {i + 1}', fontsize=18)
+    doc.set_toc([[1, f'Chapter {i + 1}', i + 1] for i in range(6)])
+    path = str(tmp_path / 'toc.pdf')
+    doc.save(path)
+    result = gemini.extract_outline(path, toc='trust', pages='2-3')
+    assert [h['page'] for h in result['outline']] == [2, 3]
+    assert result['complete'] is False and result['coverage']['ranges'] == [[2, 3]]
+    assert gemini.extract_outline(path, toc='trust', pages='1-')['complete'] is True
@@ -0,0 +1,21 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import result_cache
+
+def _churn(cache_dir, worker):
+    for i in range(200):
+        key = f'k{worker}-{i}'
+        result_cache.put(key, {'outline': ['x' * 200]}, cache_dir, max_bytes=20000, meta={'pages': i})
+        result_cache.get(f'k{(worker + 1) % 4}-{i}', cache_dir)
+    return worker
+
+def test_round_trip_and_meta(tmp_path):
+    result_cache.put('a', {'outline': []}, str(tmp_path), meta={'pages': 3})
+    assert result_cache.get('a', str(tmp_path)) == {'outline': []}
+    assert result_cache.get('a', str(tmp_path), meta=True) == ({'outline': []}, {'pages': 3})
+    assert result_cache.get('missing', str(tmp_path)) is None
+
+def test_workers_sharing_a_cache_evict_concurrently(tmp_path):
+    with ProcessPoolExecutor(4) as pool:
+        assert sorted(pool.map(_churn, [str(tmp_path)] * 4, range(4))) == [0, 1, 2, 3]
+    assert sum(p.stat().st_size for p in tmp_path.glob('*.json')) <= 20000
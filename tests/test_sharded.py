@@ -0,0 +1,22 @@
+import pytest
+
+import gemini, main1, sharded
+
+def test_shard_ranges_cover_every_page_once():
+    for n_pages, workers in ((32, 2), (120, 4), (1000, 3), (33, 8)):
+        ranges = sharded.shard_ranges(n_pages, workers)
+        assert ranges[0][0] == 0 and ranges[-1][1] == n_pages
+        assert all(stop == start for (_, stop), (start, _) in zip(ranges, ranges[1:]))
+        assert all(stop - start >= sharded.MIN_SHARD_PAGES for start, stop in ranges)
+
+@pytest.mark.parametrize('header_footer', ['band', 'repeat'])
+def test_gemini_page_workers_match_sequential(synth_pdf, header_footer):
+    assert sharded.can_shard(synth_pdf, 120, 4)
+    sequential = gemini.extract_outline(synth_pdf, toc='off', header_footer=header_footer)
+    assert sequential['outline']
+    assert gemini.extract_outline(synth_pdf, toc='off', header_footer=header_footer, page_workers=4) == sequential
+
+def test_main1_page_workers_match_sequential(synth_pdf):
+    sequential = main1.extract_headings_from_pdf(synth_pdf)
+    assert sequential['headings']
+    assert main1.extract_headings_from_pdf(synth_pdf, page_workers=4) == sequential
@@ -0,0 +1,28 @@
+import json
+
+import pytest
+
+import warm_worker
+
+@pytest.mark.parametrize('job, message', [
+    ({'pdf': 'a.pdf', 'output': 'a.jsonl', 'extractor': 'main_extractor'}, 'gemini only'),
+    ({'pdf': 'a.pdf', 'output': 'a.jsonl', 'options': {'pages': '1-3'}}, 'pages: not supported'),
+    ({'pdf': 'a.pdf', 'output': 'a.jsonl', 'options': {'page_cache': 'a.pages.json', 'deadline': 1}},
+     'page_cache, deadline: not supported'),
+])
+def test_streaming_jobs_that_cannot_stream_are_turned_down(job, message):
+    with pytest.raises(ValueError, match=message):
+        warm_worker.parse_job(json.dumps(job), 1)
+    assert warm_worker.run_job(job)['status'] == 'error'
+
+def test_main_extractor_default_checked_too():
+    with pytest.raises(ValueError, match='gemini only'):
+        warm_worker.parse_job(json.dumps({'pdf': 'a.pdf', 'output': 'a.jsonl'}), 1, 'main_extractor')
+
+def test_streamed_job_writes_jsonl(synth_pdf, tmp_path):
+    out = str(tmp_path / 'synth.jsonl')
+    rec = warm_worker.run_job(warm_worker.parse_job(json.dumps({'pdf': synth_pdf, 'output': out}), 1))
+    assert rec['status'] == 'ok'
+    with open(out) as fp:
+        lines = [json.loads(line) for line in fp]
+    assert 'title' in lines[0] and len(lines) > 1
@@ -0,0 +1,39 @@
+"""
+Batched scoring for the text heading model trained by traingemini.py.
+
+The pipeline (TF-IDF or hashing vectorizer + RandomForest) is fitted once
+at training time; here it is only ever asked to transform, never to fit.
+TextModel scores a whole batch of lines (an extractor passes all of a page's
+undecided lines at once) with one sparse transform and one forest call, and
+memoizes the label per line text: running titles, repeated captions and
+boilerplate that recur across pages and documents are vectorized once per
+process.  The memo is an LRU bounded by memo_size entries.
+"""
+from collections import OrderedDict
+
+MEMO_SIZE = 20000
+
+class TextModel:
+    takes_text = True  # heading_classifier.predict_batched passes the raw line texts
+
+    def __init__(self, pipeline, memo_size=MEMO_SIZE):
+        self.pipeline = pipeline
+        self.memo_size = memo_size
+        self.memo = OrderedDict()
+        self.hits = self.misses = 0
+
+    def predict(self, texts):
+        import numpy as np
+        new = [t for t in dict.fromkeys(texts) if t not in self.memo]
+        if new:
+            # one sparse matrix for every unseen line in the batch
+            self.memo.update(zip(new, self.pipeline.predict(new).tolist()))
+        self.misses += len(new)
+        self.hits += len(texts) - len(new)
+        out = []
+        for t in texts:
+            self.memo.move_to_end(t)
+            out.append(self.memo[t])
+        while len(self.memo) > self.memo_size:
+            self.memo.popitem(last=False)
+        return np.asarray(out)
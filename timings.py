@@ -0,0 +1,40 @@
+"""
+Startup/stage timers behind the CLIs' --timings flag.
+
+Import this module first so T0 is taken before the heavy imports; the
+startup figure is everything up to mark_ready() (imports + argument
+parsing), compared against STARTUP_BUDGET_MS.
+"""
+import json, sys, time
+from contextlib import contextmanager
+
+T0 = time.perf_counter()
+STARTUP_BUDGET_MS = 250.0  # PyMuPDF alone is most of this
+
+_stages = {}
+
+def mark_ready():
+    """Record the end of start-up (imports + argument parsing)."""
+    _stages.setdefault('startup', (time.perf_counter() - T0) * 1000)
+
+@contextmanager
+def stage(name):
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        _stages[name] = _stages.get(name, 0.0) + (time.perf_counter() - t) * 1000
+
+def report():
+    startup = _stages.get('startup', 0.0)
+    return {
+        'startup_ms': round(startup, 2),
+        'startup_budget_ms': STARTUP_BUDGET_MS,
+        'over_budget': startup > STARTUP_BUDGET_MS,
+        'model_loaded': 'heading_classifier' in sys.modules and sys.modules['heading_classifier'].load_model.cache_info().currsize > 0,
+        'stages_ms': {k: round(v, 2) for k, v in _stages.items() if k != 'startup'},
+        'total_ms': round((time.perf_counter() - T0) * 1000, 2),
+    }
+
+def print_report(file=sys.stderr):
+    print('[timings] ' + json.dumps(report()), file=file)
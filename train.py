@@ -1,45 +1,25 @@
-import os, json, re, pickle
+import argparse, pickle
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report
-
-def extract_features(span):
-    text = span.get("text","")
-    fs   = span.get("font_size",0)
-    fonts= span.get("font",[])
-    is_bold     = int(any("Bold" in f for f in fonts))
-    is_numbered = int(bool(re.match(r'^\d+(?:\.\d+)*\b', text)))
-    is_colon    = int(text.endswith(':'))
-    words = text.split()
-    wc    = len(words)
-    stops = {"and","the","of","in","to","for","with","on","by","at","from"}
-    stop_ratio  = sum(w.lower() in stops for w in words)/max(1,wc)
-    starts_upper= int(bool(re.match(r'^[A-Z0-9]', text)))
-    ends_punct  = int(text.endswith(('.', '?', '!')))
-    return [fs, is_bold, is_numbered, is_colon, wc, stop_ratio, starts_upper, ends_punct]
+from dataset import FEATURE_NAMES, build_dataset, extract_features  # extract_features kept importable from here
 
 if __name__=="__main__":
-    JSON_FOLDER = 'output'
-    LABEL_CSV   = 'labels.csv'
-
-    # 1) Read your manual labels
-    df_labels = pd.read_csv(LABEL_CSV)
+    ap = argparse.ArgumentParser(description='Train the heading classifier on labels.csv.')
+    ap.add_argument('--labels', default='labels.csv')
+    ap.add_argument('--pdf-dir', default='input', help='PDFs the labels refer to (features are cached per PDF)')
+    ap.add_argument('--json-dir', default='output', help='outline JSON used for labelled files without a PDF')
+    ap.add_argument('--workers', type=int, default=None)
+    args = ap.parse_args()
 
-    X, y = [], []
-    for _, r in df_labels.iterrows():
-        json_path = os.path.join(JSON_FOLDER, os.path.basename(r['file']).replace('.pdf','.json'))
-        data = json.load(open(json_path))
-        for span in data.get('outline',[]):
-            if span['page']==int(r['page']) and span['text']==r['text']:
-                span.setdefault('font',[])
-                X.append(extract_features(span))
-                y.append(int(r['label']))
-                break
+    # 1) Read your manual labels and build their features (see dataset.py)
+    X, y, missing = build_dataset(args.labels, args.pdf_dir, args.json_dir, workers=args.workers)
+    if missing:
+        print(f"{len(missing)} labels not found in their document, skipped")
 
     # 2) Train/Test split
-    cols = ['font_size','is_bold','is_numbered','is_colon',
-            'word_count','stop_ratio','starts_upper','ends_punct']
+    cols = FEATURE_NAMES
     df = pd.DataFrame(X, columns=cols)
     df['label'] = y
     X_train, X_test, y_train, y_test = train_test_split(df[cols], df['label'], test_size=0.2, random_state=42)
@@ -54,3 +34,13 @@ if __name__=="__main__":
     with open('heading_model.pkl','wb') as f:
         pickle.dump(clf, f)
     print("Model saved to heading_model.pkl")
+
+    # 5) Export the flat NumPy forest the extractors load (no sklearn needed at inference)
+    from forest import export_forest
+    from result_cache import file_digest
+    export_forest(clf, 'heading_model.npz', file_digest('heading_model.pkl'))
+    print("Forest exported to heading_model.npz")
+
+    # cached outlines were produced by the previous model
+    import result_cache
+    print(f"Dropped {result_cache.invalidate()} stale cache entries")
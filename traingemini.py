@@ -4,9 +4,14 @@ Train heading classifier from a single CSV or JSON file.
 Expected columns / keys:
     text   – the line
     label  – 1 for heading, 0 for body
+
+The model is saved to text_model.pkl and used by the extractors with
+classifier='text' (see text_classifier.py).  --hashing swaps the TF-IDF
+vocabulary for a HashingVectorizer, so the model's size no longer grows with
+the training vocabulary.
 """
-import os, json, pickle, pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
+import os, json, pickle, argparse, pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import classification_report
@@ -15,56 +20,91 @@ from sklearn.model_selection import train_test_split
 DATA_DIR = "training_data"
 CSV_PATH  = os.path.join(DATA_DIR, "labels.csv")
 JSON_PATH = os.path.join(DATA_DIR, "labels.json")
-MODEL_OUT = "heading_model.pkl"
+MODEL_OUT = "text_model.pkl"  # heading_classifier.TEXT_MODEL_PATH; heading_model.pkl is the 8-feature model
 
 # -----------------------------------------------------------
-def load_training_data():
-    if os.path.exists(CSV_PATH):
-        df = pd.read_csv(CSV_PATH)
-    elif os.path.exists(JSON_PATH):
-        with open(JSON_PATH, "r", encoding="utf-8") as fp:
-            df = pd.DataFrame(json.load(fp))
+def load_training_data(path=None):
+    paths = [path] if path else [CSV_PATH, JSON_PATH]
+    for p in paths:
+        if p.endswith(".csv") and os.path.exists(p):
+            df = pd.read_csv(p)
+            break
+        if p.endswith(".json") and os.path.exists(p):
+            with open(p, "r", encoding="utf-8") as fp:
+                df = pd.DataFrame(json.load(fp))
+            break
     else:
         raise FileNotFoundError(
-            "Neither labels.csv nor labels.json found in training_data/"
+            f"No labels found at {' or '.join(paths)}"
         )
     if {"text", "label"} - set(df.columns):
         raise ValueError("File must contain 'text' and 'label' fields")
     return df["text"].tolist(), df["label"].tolist()
 
+def build_pipeline(hashing=False, n_features=2**18):
+    if hashing:
+        # no fitted vocabulary: memory is fixed by n_features, only the idf weights are learned
+        vectorizer = [
+            ("hash", HashingVectorizer(
+                lowercase=True,
+                ngram_range=(1,2),
+                stop_words="english",
+                n_features=n_features,
+                alternate_sign=False,
+                norm=None
+            )),
+            ("tfidf", TfidfTransformer()),
+        ]
+    else:
+        vectorizer = [
+            ("tfidf", TfidfVectorizer(
+                lowercase=True,
+                ngram_range=(1,2),
+                max_features=10_000,
+                stop_words="english"
+            )),
+        ]
+    return Pipeline(vectorizer + [
+        ("clf", RandomForestClassifier(
+            n_estimators=200,
+            random_state=42
+        ))
+    ])
+
 # -----------------------------------------------------------
-print("Loading labeled data …")
-texts, labels = load_training_data()
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Train the TF-IDF text heading model.")
+    ap.add_argument("--data", default=None, help=f"labels .csv/.json (default: {CSV_PATH} or {JSON_PATH})")
+    ap.add_argument("--out", default=MODEL_OUT)
+    ap.add_argument("--hashing", action="store_true", help="HashingVectorizer instead of a fitted vocabulary")
+    ap.add_argument("--n-features", type=int, default=2**18, help="hash space size with --hashing")
+    args = ap.parse_args()
+
+    print("Loading labeled data …")
+    texts, labels = load_training_data(args.data)
+
+    # quick sanity
+    print(f"Samples: {len(texts)} (headings={sum(labels)}, body={len(labels)-sum(labels)})")
 
-# quick sanity
-print(f"Samples: {len(texts)} (headings={sum(labels)}, body={len(labels)-sum(labels)})")
+    pipe = build_pipeline(args.hashing, args.n_features)
 
-# simple TF-IDF → RandomForest pipeline
-pipe = Pipeline([
-    ("tfidf", TfidfVectorizer(
-        lowercase=True,
-        ngram_range=(1,2),
-        max_features=10_000,
-        stop_words="english"
-    )),
-    ("clf", RandomForestClassifier(
-        n_estimators=200,
-        random_state=42
-    ))
-])
+    X_train, X_test, y_train, y_test = train_test_split(
+        texts, labels, test_size=0.15, random_state=42, stratify=labels
+    )
 
-X_train, X_test, y_train, y_test = train_test_split(
-    texts, labels, test_size=0.15, random_state=42, stratify=labels
-)
+    print("Training …")
+    pipe.fit(X_train, y_train)
 
-print("Training …")
-pipe.fit(X_train, y_train)
+    print("\n=== Evaluation ===")
+    y_pred = pipe.predict(X_test)
+    print(classification_report(y_test, y_pred, digits=3))
 
-print("\n=== Evaluation ===")
-y_pred = pipe.predict(X_test)
-print(classification_report(y_test, y_pred, digits=3))
+    # stop_words_ keeps every term cut by max_features/stop words; it's only for introspection
+    tfidf = pipe.named_steps.get("tfidf")
+    if getattr(tfidf, "stop_words_", None) is not None:
+        tfidf.stop_words_ = None
 
-# save
-with open(MODEL_OUT, "wb") as fp:
-    pickle.dump(pipe, fp)
-print(f"Model saved → {MODEL_OUT}")
+    # save
+    with open(args.out, "wb") as fp:
+        pickle.dump(pipe, fp)
+    print(f"Model saved → {args.out}")
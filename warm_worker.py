@@ -0,0 +1,200 @@
+"""
+Long-running extraction worker that keeps the model warm between jobs.
+
+    python warm_worker.py jobs.jsonl --results results.jsonl --workers 4
+    cat jobs.jsonl | python warm_worker.py
+    python warm_worker.py --http 8765      # POST a job as JSON to http://127.0.0.1:8765/extract
+
+A job is one JSON object per line:
+
+    {"id": "a1", "pdf": "input/sample.pdf", "options": {"header_footer_thresh": 0.1},
+     "output": "output/sample.json", "extractor": "gemini"}
+
+Only "pdf" is required.  Each job produces one result line; when "output" is
+omitted the outline is returned inline under "result".  An output ending in
+.jsonl is streamed page by page (gemini.stream_outline), which only gemini
+does and which has no page cache or page bounds: such jobs are turned down
+with the other bad job lines.  Worker processes
+import the extractor (and unpickle the model) once, so per-job latency is
+just the extraction itself.
+"""
+import argparse, json, os, sys, time, traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from batch_runner import EXTRACTORS, load_extractor
+
+STREAM_UNSUPPORTED = ('page_cache', 'pages', 'deadline', 'page_workers')  # options stream_outline doesn't take
+
+# ---------- per-process job execution ----------
+
+def check_job(job, default_extractor='gemini'):
+    """Raise ValueError for a job that would fail in every worker (see the module docstring on .jsonl)."""
+    if str(job.get('output') or '').endswith('.jsonl'):
+        extractor = job.get('extractor', default_extractor)
+        if extractor != 'gemini':
+            raise ValueError(f'.jsonl output is streamed by gemini only, not {extractor}')
+        unsupported = [name for name in STREAM_UNSUPPORTED if job.get('options', {}).get(name) is not None]
+        if unsupported:
+            raise ValueError(f"{', '.join(unsupported)}: not supported with .jsonl output")
+
+def run_job(job, default_extractor='gemini'):
+    """Run one job dict and return its result record (never raises)."""
+    t0 = time.perf_counter()
+    rec = {'id': job.get('id'), 'pdf': job.get('pdf')}
+    try:
+        check_job(job, default_extractor)
+        mod = load_extractor(job.get('extractor', default_extractor))
+        out = job.get('output')
+        if out:
+            os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+        if out and out.endswith('.jsonl'):
+            mod.stream_outline(job['pdf'], out, **job.get('options', {}))
+            rec.update(status='ok', output=out)
+        else:
+            res = mod.extract_outline(job['pdf'], **job.get('options', {}))
+            if out:
+                with open(out, 'w') as fp:
+                    json.dump(res, fp, indent=2)
+                rec.update(status='ok', output=out, headings=len(res.get('outline', [])))
+            else:
+                rec.update(status='ok', result=res)
+    except Exception as e:
+        rec.update(status='error', error=f'{type(e).__name__}: {e}', trace=traceback.format_exc())
+    rec['secs'] = time.perf_counter() - t0
+    return rec
+
+# ---------- pool ----------
+
+class WarmPool:
+    """Process pool whose workers preload an extractor; rebuilt if a worker dies."""
+
+    def __init__(self, extractor='gemini', workers=None):
+        self.extractor = extractor
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = self._start()
+
+    def _start(self):
+        return ProcessPoolExecutor(self.workers, initializer=load_extractor, initargs=(self.extractor,))
+
+    def submit(self, job):
+        try:
+            return self._pool.submit(run_job, job, self.extractor)
+        except BrokenProcessPool:
+            self._pool = self._start()
+            return self._pool.submit(run_job, job, self.extractor)
+
+    def result(self, future, job):
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            return {'id': job.get('id'), 'pdf': job.get('pdf'), 'status': 'error', 'error': f'worker crashed: {e}'}
+
+    def shutdown(self):
+        self._pool.shutdown()
+
+# ---------- job-file / stdin mode ----------
+
+def parse_job(line, lineno, default_extractor='gemini'):
+    job = json.loads(line)
+    if not isinstance(job, dict) or 'pdf' not in job:
+        raise ValueError('job needs a "pdf" field')
+    check_job(job, default_extractor)
+    job.setdefault('id', lineno)
+    return job
+
+def serve_lines(lines, out, pool, max_inflight=None):
+    """Run every job line through pool, writing one result line to out per job; returns the error count."""
+    max_inflight = max_inflight or pool.workers * 2  # bounded read-ahead
+    inflight, errors = {}, 0
+
+    def emit(done):
+        nonlocal errors
+        for fut in done:
+            rec = pool.result(fut, inflight.pop(fut))
+            errors += rec['status'] != 'ok'
+            out.write(json.dumps(rec, ensure_ascii=False) + '\n')
+            out.flush()
+
+    for lineno, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            job = parse_job(line, lineno, pool.extractor)
+        except ValueError as e:
+            errors += 1
+            out.write(json.dumps({'id': lineno, 'status': 'error', 'error': f'bad job line: {e}'}) + '\n')
+            out.flush()
+            continue
+        if len(inflight) >= max_inflight:
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            emit(done)
+        inflight[pool.submit(job)] = job
+    emit(wait(inflight)[0] if inflight else ())
+    return errors
+
+# ---------- HTTP mode ----------
+
+def serve_http(pool, port, host='127.0.0.1'):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code, body):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._reply(200, {'status': 'ok', 'extractor': pool.extractor, 'workers': pool.workers})
+            else:
+                self._reply(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/extract':
+                return self._reply(404, {'error': 'not found'})
+            try:
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                job = parse_job(body.decode('utf-8'), None, pool.extractor)
+            except ValueError as e:
+                return self._reply(400, {'status': 'error', 'error': f'bad job: {e}'})
+            rec = pool.result(pool.submit(job), job)
+            self._reply(200 if rec['status'] == 'ok' else 500, rec)
+
+        def log_message(self, fmt, *args):
+            sys.stderr.write('[warm_worker] ' + fmt % args + '\n')
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f'[✓] listening on http://{host}:{port}/extract', file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Serve outline extraction jobs with a warm model.')
+    ap.add_argument('jobs', nargs='?', default='-', help='JSONL job file, or - for stdin')
+    ap.add_argument('--results', default='-', help='JSONL result file, or - for stdout')
+    ap.add_argument('--extractor', choices=EXTRACTORS, default='gemini')
+    ap.add_argument('--workers', type=int, default=None, help='max concurrent jobs (default: number of CPUs)')
+    ap.add_argument('--http', type=int, metavar='PORT', default=None, help='serve POST /extract on localhost instead')
+    args = ap.parse_args(argv)
+
+    pool = WarmPool(args.extractor, args.workers)
+    try:
+        if args.http is not None:
+            serve_http(pool, args.http)
+            return 0
+        src = sys.stdin if args.jobs == '-' else open(args.jobs, encoding='utf-8')
+        dst = sys.stdout if args.results == '-' else open(args.results, 'w', encoding='utf-8')
+        with src, dst:
+            return 1 if serve_lines(src, dst, pool) else 0
+    finally:
+        pool.shutdown()
+
+if __name__ == '__main__':
+    sys.exit(main())